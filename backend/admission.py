@@ -0,0 +1,120 @@
+"""
+Admission control for the backend's workload classes.
+
+Each class of work (NO2 inference, AQI model training, outbound LLM calls) runs
+on its own bounded executor, so a burst of slow /city-aqi fits or Gemini calls
+can't starve cheap /predict-no2 requests. When a pool's queue is full, or an
+endpoint is over its concurrency limit, the request is shed immediately with a
+Retry-After hint instead of waiting in line.
+
+All counters are only touched from the event loop thread, so they need no locks.
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control (429 or 503 with Retry-After)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class WorkloadPool:
+    """A bounded executor that rejects work once max_queue tasks are waiting."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self.start()
+        self._pending = 0  # running + queued
+        self._avg_seconds = 1.0  # EWMA of task duration, used for Retry-After
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        """Tasks the pool accepts (running + queued) before shedding with a 503."""
+        return self.max_workers + self.max_queue
+
+    def start(self):
+        """(Re)create the executor; a no-op if it is already running."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix=self.name
+            )
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = max(1, self._pending - self.max_workers + 1)
+        return max(1, math.ceil(backlog * self._avg_seconds / self.max_workers))
+
+    async def run(self, fn, *args, **kwargs):
+        if self._pending >= self.capacity:
+            self.rejected += 1
+            raise Overloaded(
+                503, f"{self.name} pool is saturated, retry later", self.retry_after()
+            )
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - started
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def status(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "avg_seconds": round(self._avg_seconds, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ConcurrencyLimit:
+    """Caps in-flight requests for one endpoint; excess requests get a 429."""
+
+    @classmethod
+    def share_of(cls, name: str, pool: WorkloadPool, share: float) -> "ConcurrencyLimit":
+        """A limit at `share` of the pool's capacity, so the 429 fires before its 503."""
+        return cls(name, max(1, int(pool.capacity * share)), pool)
+
+    def __init__(self, name: str, limit: int, pool: WorkloadPool):
+        self.name = name
+        self.limit = limit
+        self.pool = pool
+        self._in_flight = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        if self._in_flight >= self.limit:
+            self.rejected += 1
+            raise Overloaded(
+                429, f"Too many concurrent {self.name} requests", self.pool.retry_after()
+            )
+        self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self._in_flight -= 1
+        return False
+
+    def status(self) -> dict:
+        return {"limit": self.limit, "in_flight": self._in_flight, "rejected": self.rejected}
@@ -0,0 +1,224 @@
+"""
+Shared AQI forecasting features.
+
+Both the offline trainer (train_aqi_forecaster.py) and the request path in
+main.py build model inputs through this module, so a model trained here sees
+exactly the features it is served with.
+"""
+
+import numpy as np
+import pandas as pd
+
+from backend.nasa_power import WEATHER_PARAMS, parse_power_parameters
+
+# South Carolina cities with coordinates
+SC_CITIES = {
+    "Charleston": {"lat": 32.7765, "lon": -79.9311},
+    "Columbia": {"lat": 34.0007, "lon": -81.0348},
+    "Greenville": {"lat": 34.8526, "lon": -82.3940},
+    "Myrtle Beach": {"lat": 33.6891, "lon": -78.8867},
+    "Spartanburg": {"lat": 34.9496, "lon": -81.9320},
+    "Florence": {"lat": 34.1954, "lon": -79.7626},
+    "Rock Hill": {"lat": 34.9249, "lon": -81.0251},
+    "Sumter": {"lat": 33.9204, "lon": -80.3414},
+    "Anderson": {"lat": 34.5034, "lon": -82.6501},
+    "Clemson": {"lat": 34.6834, "lon": -82.8374},
+}
+
+# Used in place of missing (-999) NASA POWER values
+WEATHER_DEFAULTS = {
+    "T2M": 20,
+    "T2M_MAX": 25,
+    "T2M_MIN": 15,
+    "RH2M": 50,
+    "PRECTOTCORR": 0,
+    "WS10M": 5,
+    "PS": 101.3,
+}
+
+# Number of previous days of AQI/weather that feed a single prediction
+WINDOW = 5
+
+FEATURE_NAMES = (
+    [f"aqi_lag_{WINDOW - j}" for j in range(WINDOW)]
+    + [f"{p}_mean" for p in WEATHER_PARAMS]
+    + ["doy_sin", "doy_cos", "weekday"]
+    + [f"city_{c}" for c in SC_CITIES]
+)
+
+
+def calculate_aqi_from_weather(weather_row):
+    """
+    Simple AQI estimation from weather parameters
+    Based on empirical relationships between weather and air quality
+    """
+    temp = weather_row.get("T2M", 20)
+    humidity = weather_row.get("RH2M", 50)
+    wind_speed = weather_row.get("WS10M", 5)
+    precipitation = weather_row.get("PRECTOTCORR", 0)
+    pressure = weather_row.get("PS", 101.3)
+
+    # Check for invalid/missing data (NASA POWER API uses -999 for missing data)
+    if (
+        temp < -900
+        or humidity < -900
+        or wind_speed < -900
+        or precipitation < -900
+        or pressure < -900
+    ):
+        # Return a reasonable default for missing data rather than an extreme value
+        return 50  # Moderate AQI is a reasonable default
+
+    # Base AQI calculation
+    base_aqi = 50  # Moderate baseline
+
+    # Weather effects on AQI
+    temp_effect = (temp - 20) * 0.8  # Higher temp = higher AQI
+    wind_effect = -(wind_speed - 5) * 2.5  # Higher wind = lower AQI
+    humidity_effect = abs(humidity - 55) * 0.3  # Extreme humidity = higher AQI
+    precip_effect = -precipitation * 3  # Rain = lower AQI
+    pressure_effect = (pressure - 101.3) * 0.5  # High pressure = higher AQI
+
+    # Calculate final AQI
+    aqi = (
+        base_aqi
+        + temp_effect
+        + wind_effect
+        + humidity_effect
+        + precip_effect
+        + pressure_effect
+    )
+
+    # Add realistic variation
+    aqi += np.random.normal(0, 8)
+
+    # Keep within realistic bounds
+    return max(10, min(150, aqi))
+
+
+def calculate_aqi_array(df: pd.DataFrame, rng: np.random.Generator) -> np.ndarray:
+    """Vectorized calculate_aqi_from_weather over a whole history, noise drawn from rng."""
+    temp = df["T2M"].to_numpy(dtype=float)
+    humidity = df["RH2M"].to_numpy(dtype=float)
+    wind_speed = df["WS10M"].to_numpy(dtype=float)
+    precipitation = df["PRECTOTCORR"].to_numpy(dtype=float)
+    pressure = df["PS"].to_numpy(dtype=float)
+
+    missing = (
+        (temp < -900)
+        | (humidity < -900)
+        | (wind_speed < -900)
+        | (precipitation < -900)
+        | (pressure < -900)
+    )
+    aqi = (
+        50
+        + (temp - 20) * 0.8
+        - (wind_speed - 5) * 2.5
+        + np.abs(humidity - 55) * 0.3
+        - precipitation * 3
+        + (pressure - 101.3) * 0.5
+    )
+    aqi += rng.normal(0, 8, size=len(aqi))
+    aqi = np.clip(aqi, 10, 150)
+    aqi[missing] = 50
+    return aqi
+
+
+def power_frame(dates: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+    """DataFrame (date, *WEATHER_PARAMS) from parse_power_parameters-style arrays."""
+    if len(dates) > 1 and (np.diff(dates) < np.timedelta64(0, "D")).any():
+        order = np.argsort(dates, kind="stable")
+        dates, values = dates[order], values[order]
+    df = pd.DataFrame(values, columns=WEATHER_PARAMS)
+    # datetime64[D] -> datetime.date objects in a single C-level conversion
+    df.insert(0, "date", dates.astype("datetime64[D]").astype(object))
+    return df
+
+
+def power_to_frame(weather_data) -> pd.DataFrame:
+    """Turn a NASA POWER `properties.parameter` block into a date-sorted DataFrame."""
+    # float64 keeps the API's decimal values exact in responses
+    return power_frame(*parse_power_parameters(weather_data, dtype=np.float64))
+
+
+def fill_missing_weather(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace -999 values with the column's valid mean (or WEATHER_DEFAULTS)."""
+    df = df.copy()
+    for col in WEATHER_PARAMS:
+        invalid = df[col] < -900
+        if invalid.any():
+            valid = df.loc[~invalid, col]
+            df.loc[invalid, col] = (
+                valid.mean() if len(valid) else WEATHER_DEFAULTS.get(col, 0)
+            )
+    return df
+
+
+def _date_features(dates) -> np.ndarray:
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    angle = 2 * np.pi * (dates.dayofyear.to_numpy() - 1) / 365.25
+    return np.column_stack([np.sin(angle), np.cos(angle), dates.weekday.to_numpy()])
+
+
+def _city_one_hot(city: str, n: int) -> np.ndarray:
+    one_hot = np.zeros((n, len(SC_CITIES)))
+    one_hot[:, list(SC_CITIES).index(city)] = 1
+    return one_hot
+
+
+def build_training_matrix(df: pd.DataFrame, city: str, horizon: int = 1):
+    """
+    Vectorized (X, y) for one city's history.
+
+    Row i predicts df.aqi[i + WINDOW + horizon - 1] from the WINDOW days starting
+    at i: their AQI values, their mean weather and the seasonal/city features of
+    the target day. horizon=1 is the next-day model served by /city-aqi.
+    """
+    n = len(df) - WINDOW - horizon + 1
+    if n <= 0:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+
+    aqi = df["aqi"].to_numpy(dtype=float)
+    weather = df[WEATHER_PARAMS].to_numpy(dtype=float)
+    aqi_lags = np.lib.stride_tricks.sliding_window_view(aqi, WINDOW)[:n]
+    # Rolling means of each WINDOW-day block
+    csum = np.vstack([np.zeros(len(WEATHER_PARAMS)), np.cumsum(weather, axis=0)])
+    weather_means = (csum[WINDOW : WINDOW + n] - csum[:n]) / WINDOW
+    target = slice(WINDOW + horizon - 1, WINDOW + horizon - 1 + n)
+
+    X = np.hstack(
+        [
+            aqi_lags,
+            weather_means,
+            _date_features(df["date"].iloc[target]),
+            _city_one_hot(city, n),
+        ]
+    )
+    return X, aqi[target]
+
+
+def feature_row(aqi_window, weather_means, day, city) -> np.ndarray:
+    """
+    Features predicting `day` from the WINDOW previous AQI values and their mean weather.
+
+    Same columns as a row of build_training_matrix.
+    """
+    return np.hstack(
+        [
+            aqi_window,
+            weather_means,
+            _date_features([day])[0],
+            _city_one_hot(city, 1)[0],
+        ]
+    )
+
+
+def build_prediction_features(recent: pd.DataFrame, city: str, prediction_date):
+    """Single feature row predicting prediction_date from the last WINDOW rows of recent."""
+    recent = recent.tail(WINDOW)
+    aqi = recent["aqi"].to_numpy(dtype=float)
+    if len(aqi) < WINDOW:
+        aqi = np.pad(aqi, (WINDOW - len(aqi), 0), "edge")
+    weather_means = recent[WEATHER_PARAMS].to_numpy(dtype=float).mean(axis=0)
+    return feature_row(aqi, weather_means, prediction_date, city).reshape(1, -1)
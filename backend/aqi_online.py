@@ -0,0 +1,166 @@
+"""
+Incrementally updated per-city AQI forecasters.
+
+Each city keeps a small state: the last WINDOW days of AQI and weather, the
+running weather sums over that window, and an SGD regressor with an online
+feature scaler. Ingesting a new day is O(WINDOW) work (one partial_fit on a
+single row) instead of refitting over the whole history, and produces the same
+feature rows as aqi_features.build_training_matrix.
+
+    python -m backend.aqi_online            # refresh every city up to today
+"""
+
+import argparse
+from collections import deque
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.aqi_features import (
+    SC_CITIES,
+    WINDOW,
+    build_training_matrix,
+    calculate_aqi_array,
+    feature_row,
+    fill_missing_weather,
+    power_frame,
+)
+from backend.nasa_power import WEATHER_PARAMS, fetch_power_arrays
+from backend.shared_cache import SharedCache
+
+# No TTL: the state is the model, it is only ever replaced by a newer one
+online_state_cache = SharedCache("online_forecaster", ttl_seconds=None)
+
+# Days of history used to seed a city that has no state yet
+BOOTSTRAP_DAYS = 365
+
+
+class OnlineCityForecaster:
+    """Rolling window + online model for one city."""
+
+    def __init__(self, city: str, seed: int = 42):
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        self.city = city
+        self.last_date: date | None = None
+        self.n_updates = 0
+        self._aqi = deque(maxlen=WINDOW)
+        self._weather = deque(maxlen=WINDOW)
+        self._weather_sum = np.zeros(len(WEATHER_PARAMS))
+        self._scaler = StandardScaler()
+        self._model = SGDRegressor(
+            learning_rate="invscaling", eta0=0.01, alpha=1e-4, random_state=seed
+        )
+
+    @property
+    def window_full(self) -> bool:
+        return len(self._aqi) == WINDOW
+
+    def features_for(self, day) -> np.ndarray:
+        """Feature row predicting `day` from the current window."""
+        return feature_row(
+            np.fromiter(self._aqi, dtype=float, count=WINDOW),
+            self._weather_sum / WINDOW,
+            day,
+            self.city,
+        )
+
+    def _push(self, day, aqi: float, weather: np.ndarray):
+        if self.window_full:
+            self._weather_sum -= self._weather[0]
+        self._aqi.append(aqi)
+        self._weather.append(weather)
+        self._weather_sum += weather
+        self.last_date = day
+
+    def bootstrap(self, df):
+        """Seed the model from a history DataFrame (date, WEATHER_PARAMS, aqi)."""
+        X, y = build_training_matrix(df, self.city)
+        if len(y):
+            self._scaler.partial_fit(X)
+            self._model.partial_fit(self._scaler.transform(X), y)
+            self.n_updates += len(y)
+        weather = df[WEATHER_PARAMS].to_numpy(dtype=float)
+        aqi = df["aqi"].to_numpy(dtype=float)
+        for i in range(max(0, len(df) - WINDOW), len(df)):
+            self._push(df["date"].iloc[i], aqi[i], weather[i])
+
+    def ingest(self, day, weather: np.ndarray, aqi: float):
+        """Learn from one new day, then slide it into the window."""
+        if self.window_full:
+            x = self.features_for(day).reshape(1, -1)
+            self._scaler.partial_fit(x)
+            self._model.partial_fit(self._scaler.transform(x), [aqi])
+            self.n_updates += 1
+        self._push(day, aqi, np.asarray(weather, dtype=float))
+
+    def predict(self, day) -> float:
+        if not self.window_full or self.n_updates == 0:
+            raise RuntimeError(f"Online forecaster for {self.city} isn't trained yet")
+        x = self.features_for(day).reshape(1, -1)
+        return float(self._model.predict(self._scaler.transform(x))[0])
+
+
+def load_online_forecaster(city):
+    return online_state_cache.get(city)
+
+
+def save_online_forecaster(forecaster: OnlineCityForecaster):
+    online_state_cache.set(forecaster.city, forecaster)
+
+
+def refresh_city(city, end_date, fetch=None, rng=None):
+    """Bring a city's forecaster up to end_date, bootstrapping it if needed."""
+    if rng is None:
+        rng = np.random.default_rng()
+
+    coords = SC_CITIES[city]
+    forecaster = load_online_forecaster(city)
+    if forecaster is None:
+        start_date = end_date - timedelta(days=BOOTSTRAP_DAYS)
+    elif forecaster.last_date >= end_date:
+        return forecaster, 0
+    else:
+        start_date = forecaster.last_date + timedelta(days=1)
+
+    df = power_frame(
+        *fetch_power_arrays(coords["lat"], coords["lon"], start_date, end_date, fetch=fetch)
+    )
+    # POWER reports -999 for days it hasn't processed yet; drop that trailing run so
+    # those days are fetched again on the next refresh
+    valid = ~(df[WEATHER_PARAMS] < -900).any(axis=1).to_numpy()
+    if not valid.any():
+        return forecaster, 0
+    df = fill_missing_weather(df.iloc[: len(valid) - int(np.argmax(valid[::-1]))])
+    df = df.assign(aqi=calculate_aqi_array(df, rng))
+
+    if forecaster is None:
+        forecaster = OnlineCityForecaster(city)
+        forecaster.bootstrap(df)
+    else:
+        weather = df[WEATHER_PARAMS].to_numpy(dtype=float)
+        aqi = df["aqi"].to_numpy()
+        for i, day in enumerate(df["date"]):
+            forecaster.ingest(day, weather[i], aqi[i])
+
+    save_online_forecaster(forecaster)
+    return forecaster, len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the online AQI forecasters")
+    parser.add_argument("--cities", nargs="*", default=list(SC_CITIES))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    end_date = date.today() - timedelta(days=1)
+    for city in args.cities:
+        forecaster, n_days = refresh_city(city, end_date, rng=rng)
+        last = forecaster.last_date if forecaster is not None else None
+        print(f"✅ {city}: ingested {n_days} day(s), state through {last}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Walk-forward backtesting for the AQI forecaster.
+
+Each city's full history is loaded once, every (window, horizon) sample is
+built in one vectorized pass, and (city, horizon) evaluations run in parallel
+on a process pool. Works fully offline against the shared POWER cache or
+synthetic weather.
+
+    python -m backend.backtest_aqi --source synthetic --years 3 --horizons 1 3 7
+    python -m backend.backtest_aqi --source cache --report backtest.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backend.aqi_features import SC_CITIES, build_training_matrix, calculate_aqi_array
+from backend.nasa_power import WEATHER_PARAMS, PowerAPIError
+from backend.train_aqi_forecaster import load_city_history
+
+
+def _yearly_noise(seed, lat, lon, year):
+    """One calendar year of noise draws, seeded per (seed, location, year)."""
+    rng = np.random.default_rng([seed, int(abs(lat) * 1e4), int(abs(lon) * 1e4), year])
+    return rng.standard_normal((6, 366)), rng.gamma(0.6, 5, 366), rng.random(366)
+
+
+def synthetic_power_daily(lat, lon, start_date, end_date, seed=0):
+    """
+    A POWER-shaped `properties.parameter` block with seasonal, city-specific weather.
+
+    Noise is drawn per calendar year and indexed by day of year, so a given day
+    gets the same weather whatever range it is requested in, and different years
+    get independent weather.
+    """
+    days = pd.date_range(start_date, end_date, freq="D")
+    season = np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 200) / 365.25)
+    n = len(days)
+
+    z = np.empty((6, n))
+    rain, wet = np.empty(n), np.empty(n)
+    years = days.year.to_numpy()
+    for year in np.unique(years):
+        in_year = years == year
+        doy = days.dayofyear.to_numpy()[in_year] - 1
+        year_z, year_rain, year_wet = _yearly_noise(seed, lat, lon, int(year))
+        z[:, in_year] = year_z[:, doy]
+        rain[in_year] = year_rain[doy]
+        wet[in_year] = year_wet[doy]
+
+    t2m = 17 + 10 * season - (lat - 33) * 1.5 + 3 * z[0]
+    values = {
+        "T2M": t2m,
+        "T2M_MAX": t2m + 5 + z[1],
+        "T2M_MIN": t2m - 5 + z[2],
+        "RH2M": np.clip(70 + 8 * season + 10 * z[3], 15, 100),
+        "PRECTOTCORR": rain * (wet < 0.35),
+        "WS10M": np.clip(3.5 - season + 1.2 * z[4], 0.2, None),
+        "PS": 100.6 - (lat - 33) * 0.3 + 0.5 * z[5],
+    }
+    keys = days.strftime("%Y%m%d")
+    return {p: dict(zip(keys, np.round(values[p], 2).tolist())) for p in WEATHER_PARAMS}
+
+
+def load_histories(source, cities, start_date, end_date, seed):
+    """Load each city's full history exactly once."""
+
+    def synthetic(lat, lon, start, end):
+        return synthetic_power_daily(lat, lon, start, end, seed)
+
+    fetch = synthetic if source == "synthetic" else None
+    rng = np.random.default_rng(seed)
+    histories = {}
+    for city in cities:
+        df = load_city_history(
+            city, start_date, end_date, fetch=fetch, offline=source == "cache"
+        )
+        histories[city] = df.assign(aqi=calculate_aqi_array(df, rng))
+    return histories
+
+
+def walk_forward(task):
+    """
+    Expanding-window evaluation of one (city, horizon).
+
+    The model is refit every `step` samples on everything whose target day is
+    already known, and predicts the next `step` samples.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    city, horizon, df, min_train, step, n_estimators, seed = task
+    X, y = build_training_matrix(df, city, horizon)
+    started = time.perf_counter()
+
+    errors = []
+    for fold_start in range(min_train, len(y), step):
+        # Only samples whose target day is on or before the fold's first forecast
+        # day (the last day of its feature window) were known at forecast time
+        train_end = fold_start - horizon + 1
+        if train_end <= 0:
+            continue
+        model = RandomForestRegressor(
+            n_estimators=n_estimators, min_samples_leaf=2, random_state=seed, n_jobs=1
+        )
+        model.fit(X[:train_end], y[:train_end])
+        fold = slice(fold_start, min(fold_start + step, len(y)))
+        errors.append(model.predict(X[fold]) - y[fold])
+
+    errors = np.concatenate(errors) if errors else np.empty(0)
+    return {
+        "city": city,
+        "horizon": horizon,
+        "predictions": int(len(errors)),
+        "mae": round(float(np.abs(errors).mean()), 3) if len(errors) else None,
+        "rmse": round(float(np.sqrt((errors**2).mean())), 3) if len(errors) else None,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_backtest(histories, horizons, min_train, step, n_estimators, seed, workers):
+    tasks = [
+        (city, h, df, min_train, step, n_estimators, seed)
+        for city, df in histories.items()
+        for h in horizons
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(walk_forward, tasks))
+    elapsed = time.perf_counter() - started
+
+    total = sum(r["predictions"] for r in results)
+    return {
+        "results": results,
+        "total_predictions": total,
+        "wall_seconds": round(elapsed, 3),
+        "predictions_per_second": round(total / elapsed, 1) if elapsed else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward AQI forecaster backtest")
+    parser.add_argument(
+        "--source",
+        choices=["synthetic", "cache", "power"],
+        default="synthetic",
+        help="synthetic weather, the shared POWER cache only, or the live API",
+    )
+    parser.add_argument("--cities", nargs="*", default=list(SC_CITIES))
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument(
+        "--end-date",
+        type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+        default=date.today() - timedelta(days=7),
+    )
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 3, 7])
+    parser.add_argument(
+        "--min-train", type=int, default=365, help="Samples before the first fold"
+    )
+    parser.add_argument("--step", type=int, default=30, help="Samples per fold")
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    start_date = args.end_date - timedelta(days=365 * args.years)
+    print(
+        f"📡 Loading {len(args.cities)} histories ({args.source}) "
+        f"{start_date} → {args.end_date}"
+    )
+    try:
+        histories = load_histories(
+            args.source, args.cities, start_date, args.end_date, args.seed
+        )
+    except PowerAPIError as e:
+        sys.exit(f"❌ {e} (run backend.train_aqi_forecaster with the same range first)")
+
+    report = run_backtest(
+        histories,
+        args.horizons,
+        args.min_train,
+        args.step,
+        args.n_estimators,
+        args.seed,
+        args.workers,
+    )
+    report["config"] = {
+        "source": args.source,
+        "history": [start_date.isoformat(), args.end_date.isoformat()],
+        "horizons": args.horizons,
+        "min_train": args.min_train,
+        "step": args.step,
+        "n_estimators": args.n_estimators,
+        "seed": args.seed,
+    }
+
+    print(f"\n{'City':<14}{'h':>3}{'n':>7}{'MAE':>8}{'RMSE':>8}")
+    for r in report["results"]:
+        print(
+            f"{r['city']:<14}{r['horizon']:>3}{r['predictions']:>7}"
+            f"{str(r['mae']):>8}{str(r['rmse']):>8}"
+        )
+    print(
+        f"\n⚡ {report['total_predictions']} predictions in {report['wall_seconds']}s "
+        f"({report['predictions_per_second']}/s)"
+    )
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to {os.path.abspath(args.report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-ins for the Gemini and NASA POWER APIs.
+
+Used by backend.loadtest so the backend can be exercised under load without
+calling Google or NASA. Both servers add configurable latency and fail a
+configurable fraction of requests.
+
+    python -m backend.fake_upstreams --gemini-port 9001 --power-port 9002
+"""
+
+import abc
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backend.backtest_aqi import synthetic_power_daily
+
+POWER_PATH = "/api/temporal/daily/point"
+
+FAKE_ADVICE = """🚨 SMOKE ALERT: Upstate SC
+
+IMMEDIATE ACTIONS:
+• Stay indoors with windows closed - smoke levels are elevated
+• Run HVAC on recirculate with a clean filter
+
+HEALTH PRECAUTIONS:
+• Sensitive groups should avoid outdoor exertion
+
+⏰ TIMELINE: Conditions should improve within 24 hours"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set per server class in FakeUpstream
+    upstream: "FakeUpstream"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        upstream = self.upstream
+        upstream.requests += 1
+        time.sleep(upstream.sample_latency())
+        if random.random() < upstream.error_rate:
+            upstream.errors += 1
+            self._send_json(upstream.error_status, {"error": "injected failure"})
+            return
+        status, payload = upstream.respond(self)
+        self._send_json(status, payload)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        self._handle()
+
+
+class FakeUpstream(abc.ABC):
+    """Threaded HTTP server with injected latency and errors."""
+
+    error_status = 500
+
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        jitter_ms: float = 20,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        handler = type("Handler", (_Handler,), {"upstream": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample_latency(self) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    @abc.abstractmethod
+    def respond(self, request: BaseHTTPRequestHandler):
+        """Return (status, JSON payload) for a request that wasn't failed on purpose."""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "injected_errors": self.errors,
+        }
+
+
+class FakeGemini(FakeUpstream):
+    """Answers `models/*:generateContent` REST calls with a canned advisory."""
+
+    def respond(self, request):
+        if ":generateContent" not in request.path:
+            return 404, {"error": {"code": 404, "message": "not found"}}
+        return 200, {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": FAKE_ADVICE}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }
+            ],
+            "usageMetadata": {"promptTokenCount": 150, "candidatesTokenCount": 80},
+        }
+
+
+class FakePower(FakeUpstream):
+    """Serves synthetic daily weather in NASA POWER's JSON layout."""
+
+    error_status = 503
+
+    def respond(self, request):
+        url = urlparse(request.path)
+        if url.path != POWER_PATH:
+            return 404, {"messages": ["not found"]}
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        start = datetime.strptime(query["start"], "%Y%m%d").date()
+        end = datetime.strptime(query["end"], "%Y%m%d").date()
+        parameters = synthetic_power_daily(
+            float(query["latitude"]), float(query["longitude"]), start, end
+        )
+        return 200, {"type": "Feature", "properties": {"parameter": parameters}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run fake Gemini and NASA POWER servers")
+    parser.add_argument("--gemini-port", type=int, default=9001)
+    parser.add_argument("--power-port", type=int, default=9002)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    common = dict(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate
+    )
+    gemini = FakeGemini(port=args.gemini_port, **common).start()
+    power = FakePower(port=args.power_port, **common).start()
+    print(f"🤖 Fake Gemini:     GEMINI_API_ENDPOINT={gemini.base_url}")
+    print(f"🛰️ Fake NASA POWER: NASA_POWER_BASE_URL={power.base_url}{POWER_PATH}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        gemini.stop()
+        power.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+In-memory feature store for the NO2 model.
+
+Every tracked location owns one row of a single contiguous float32 block that
+holds a ring buffer of its last WINDOW NO2 values. Each value is written twice
+(at `pos` and `pos + WINDOW`), so a location's history in chronological order
+is always the contiguous slice `row[head:head + WINDOW]` and a whole
+`(N, WINDOW, 1)` model batch is one `np.take` into a reusable buffer.
+
+A store lives in one process. Under a multi-worker server each worker has its
+own store, and observations pushed to one worker are invisible to the others.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Matches the (1, 10, 1) input of the NO2 model
+WINDOW = 10
+
+
+class NO2FeatureStore:
+    """Fixed-size per-location ring buffers in one contiguous NumPy block."""
+
+    def __init__(self, capacity: int = 1024, window: int = WINDOW, max_batch: int = 512):
+        self.window = window
+        self.max_batch = max_batch
+        self._block = np.full((capacity, 2 * window), np.nan, dtype=np.float32)
+        self._head = np.zeros(capacity, dtype=np.int64)  # next write position
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._rows: dict[str, int] = {}
+        self._offsets = np.arange(window, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._version = 0  # bumped on every push
+        self._saved_version = 0
+        # Per-thread scratch buffers, allocated once per serving thread
+        self._scratch = threading.local()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, location: str) -> bool:
+        return location in self._rows
+
+    @property
+    def locations(self) -> list[str]:
+        return list(self._rows)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether anything was pushed since the last save (or load)."""
+        return self._version != self._saved_version
+
+    def _row_for(self, location: str) -> int:
+        row = self._rows.get(location)
+        if row is None:
+            row = len(self._rows)
+            if row == len(self._block):
+                self._grow()
+            self._rows[location] = row
+        return row
+
+    def _grow(self):
+        capacity = 2 * len(self._block)
+        block = np.full((capacity, 2 * self.window), np.nan, dtype=np.float32)
+        block[: len(self._block)] = self._block
+        self._block = block
+        self._head = np.resize(self._head, capacity)
+        self._count = np.resize(self._count, capacity)
+        self._head[len(self._rows) :] = 0
+        self._count[len(self._rows) :] = 0
+
+    def push(self, location: str, value: float):
+        """Append the newest observation for a location."""
+        with self._lock:
+            row = self._row_for(location)
+            pos = self._head[row]
+            self._block[row, pos] = value
+            self._block[row, pos + self.window] = value
+            self._head[row] = (pos + 1) % self.window
+            self._count[row] = min(self._count[row] + 1, self.window)
+            self._version += 1
+
+    def push_many(self, observations):
+        """Append (location, value) pairs in order."""
+        for location, value in observations:
+            self.push(location, value)
+
+    def is_ready(self, location: str) -> bool:
+        row = self._rows.get(location)
+        return row is not None and self._count[row] == self.window
+
+    def latest(self, location: str) -> np.ndarray:
+        """A copy of a location's values, oldest first (may be shorter than WINDOW)."""
+        with self._lock:
+            row = self._rows[location]
+            head, count = self._head[row], self._count[row]
+            return self._block[row, head + self.window - count : head + self.window].copy()
+
+    def _buffers(self):
+        scratch = self._scratch
+        if getattr(scratch, "out", None) is None:
+            scratch.out = np.empty((self.max_batch, self.window, 1), dtype=np.float32)
+            scratch.idx = np.empty((self.max_batch, self.window), dtype=np.int64)
+            scratch.rows = np.empty(self.max_batch, dtype=np.int64)
+            scratch.base = np.empty(self.max_batch, dtype=np.int64)
+            scratch.heads = np.empty(self.max_batch, dtype=np.int64)
+        return scratch
+
+    def batch(self, locations, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Model-ready `(len(locations), WINDOW, 1)` float32 batch.
+
+        Without `out`, the result is a view into this thread's scratch buffer and
+        is overwritten by the thread's next call; copy it if it must outlive that.
+        Raises KeyError for unknown locations and ValueError for locations with
+        fewer than WINDOW observations.
+        """
+        n = len(locations)
+        if n > self.max_batch:
+            raise ValueError(f"Batch of {n} exceeds max_batch={self.max_batch}")
+        scratch = self._buffers()
+        rows = scratch.rows[:n]
+        with self._lock:
+            for i, location in enumerate(locations):
+                row = self._rows[location]
+                if self._count[row] < self.window:
+                    raise ValueError(
+                        f"{location} has {self._count[row]} of {self.window} observations"
+                    )
+                rows[i] = row
+            # Flat index of row[head + k] for k in range(window)
+            base, heads = scratch.base[:n], scratch.heads[:n]
+            np.take(self._head, rows, out=heads)
+            np.multiply(rows, 2 * self.window, out=base)
+            np.add(base, heads, out=base)
+            idx = scratch.idx[:n]
+            np.add(base[:, None], self._offsets, out=idx)
+            if out is None:
+                out = scratch.out[:n]
+            np.take(self._block.reshape(-1), idx, out=out.reshape(n, self.window))
+        return out
+
+    def save(self, path: str | Path):
+        """Snapshot to an .npz file (written atomically via a unique temp file)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        try:
+            with self._lock:
+                n = len(self._rows)
+                version = self._version
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(
+                        f,
+                        block=self._block[:n],
+                        head=self._head[:n],
+                        count=self._count[:n],
+                        locations=np.array(list(self._rows), dtype=str),
+                        window=self.window,
+                    )
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._saved_version = version
+
+    @classmethod
+    def load(cls, path: str | Path, max_batch: int = 512) -> "NO2FeatureStore":
+        with np.load(path, allow_pickle=False) as data:
+            window = int(data["window"])
+            n = len(data["locations"])
+            store = cls(capacity=max(1024, n), window=window, max_batch=max_batch)
+            store._block[:n] = data["block"]
+            store._head[:n] = data["head"]
+            store._count[:n] = data["count"]
+            store._rows = {str(loc): i for i, loc in enumerate(data["locations"])}
+        return store
@@ -0,0 +1,387 @@
+"""
+Load-testing harness for the AeroGuard backend.
+
+Starts backend.main:app (plain uvicorn, or the pre-fork server with
+--workers > 1) against local fake Gemini and NASA POWER servers, drives a
+traffic profile at a fixed request rate and writes a JSON report with latency
+percentiles, error rates and worker CPU/RSS per endpoint.
+
+    python -m backend.loadtest --profile wildfire_surge --rps 40 --duration 30 --report load.json
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from backend.aqi_features import SC_CITIES
+from backend.fake_upstreams import POWER_PATH, FakeGemini, FakePower
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+COLUMNAR_ACCEPT = "application/vnd.aeroguard.columnar+json"
+
+
+def _predict_no2():
+    return "POST", "/predict-no2", {"values": [random.uniform(1, 8) for _ in range(10)]}, {}
+
+
+def _city_aqi():
+    body = {"city": random.choice(list(SC_CITIES)), "days_back": random.randint(2, 30)}
+    return "POST", "/city-aqi", body, {}
+
+
+def _city_aqi_columnar():
+    method, path, body, _ = _city_aqi()
+    return method, path, body, {"Accept": COLUMNAR_ACCEPT}
+
+
+def _wildfire_advice():
+    body = {
+        "location": f"{random.choice(list(SC_CITIES))}, SC",
+        "user_context": random.choice(["Asthmatic senior", "Family with infant", ""]),
+    }
+    return "POST", "/wildfire-advice", body, {}
+
+
+def _pollution_advice():
+    body = {
+        "location": f"{random.choice(list(SC_CITIES))}, SC",
+        "activity": random.choice(["Evening 5K run", "Soccer practice", "Bike commute"]),
+    }
+    return "POST", "/pollution-advice", body, {}
+
+
+# Traffic mixes: (weight, request factory)
+PROFILES = {
+    "wildfire_surge": [
+        (0.55, _wildfire_advice),
+        (0.10, _pollution_advice),
+        (0.20, _predict_no2),
+        (0.15, _city_aqi),
+    ],
+    "dashboard_refresh": [
+        (0.45, _city_aqi_columnar),
+        (0.15, _city_aqi),
+        (0.35, _predict_no2),
+        (0.05, _pollution_advice),
+    ],
+    "mixed": [
+        (0.25, _predict_no2),
+        (0.25, _city_aqi),
+        (0.25, _wildfire_advice),
+        (0.25, _pollution_advice),
+    ],
+}
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process tree from /proc (Linux only)."""
+
+    def __init__(self, root_pid: int, interval: float = 0.25):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.rss_samples: list[float] = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _pids(self):
+        pids, stack = [], [self.root_pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            try:
+                children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+            except OSError:
+                continue
+            stack.extend(int(c) for c in children)
+        return pids
+
+    def cpu_seconds(self) -> float:
+        total = 0
+        for pid in self._pids():
+            try:
+                fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            total += int(fields[11]) + int(fields[12])  # utime + stime
+        return total / self._ticks
+
+    def rss_mb(self) -> float:
+        total = 0
+        for pid in self._pids():
+            try:
+                for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            except OSError:
+                continue
+        return total / 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.rss_samples.append(self.rss_mb())
+
+    def __enter__(self):
+        self.rss_samples = []
+        self._cpu_start = self.cpu_seconds()
+        self._wall_start = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.cpu_used = self.cpu_seconds() - self._cpu_start
+        self.wall = time.perf_counter() - self._wall_start
+        return False
+
+    def summary(self, n_requests: int) -> dict:
+        samples = self.rss_samples or [self.rss_mb()]
+        return {
+            "cpu_seconds": round(self.cpu_used, 3),
+            "cpu_percent": round(100 * self.cpu_used / self.wall, 1) if self.wall else None,
+            "cpu_ms_per_request": (
+                round(1000 * self.cpu_used / n_requests, 2) if n_requests else None
+            ),
+            "rss_mb_mean": round(float(np.mean(samples)), 1),
+            "rss_mb_peak": round(float(np.max(samples)), 1),
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(port, workers, gemini, power, cache_path):
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "loadtest",
+        "GEMINI_API_ENDPOINT": gemini.base_url,
+        "NASA_POWER_BASE_URL": power.base_url + POWER_PATH,
+        "AEROGUARD_CACHE_PATH": str(cache_path),
+    }
+    if workers > 1:
+        cmd = ["-m", "backend.serve", "--workers", str(workers)]
+    else:
+        cmd = ["-m", "uvicorn", "backend.main:app"]
+    cmd = [sys.executable, *cmd, "--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen(
+        cmd, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_up(base_url, timeout, require_ready):
+    path = "/readyz" if require_ready else "/healthz"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + path, timeout=2).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Backend didn't answer {path} within {timeout}s")
+
+
+def factory_name(factory) -> str:
+    """Report key for a request factory (e.g. "city_aqi_columnar")."""
+    return factory.__name__.lstrip("_")
+
+
+def drive(base_url, factories, rps, duration, concurrency):
+    """
+    Open-loop load: requests are scheduled whether or not earlier ones finished.
+
+    Latency is measured from each request's scheduled start, not from when a
+    sender thread picked it up, so time spent waiting for a free thread under
+    overload is counted (no coordinated omission).
+    """
+    weights = [w for w, _ in factories]
+    makers = [f for _, f in factories]
+    names = [factory_name(f) for f in makers]
+    results = defaultdict(list)  # factory name -> [(latency_s, status)]
+    local = threading.local()
+
+    def send(scheduled, name, method, path, body, headers):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            status = session.request(
+                method, base_url + path, json=body, headers=headers, timeout=60
+            ).status_code
+        except requests.RequestException:
+            status = 0
+        results[name].append((time.perf_counter() - scheduled, status))
+
+    total = int(rps * duration)
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            k = random.choices(range(len(makers)), weights)[0]
+            pool.submit(send, scheduled, names[k], *makers[k]())
+    return results, time.perf_counter() - started
+
+
+def summarize_latencies(samples) -> dict:
+    if not samples:
+        # Low-weight factories can go unsampled in a short run
+        return {
+            "count": 0,
+            "errors": 0,
+            "error_rate": 0.0,
+            "status_counts": {},
+            "latency_ms": None,
+        }
+    latencies = np.array([s[0] for s in samples]) * 1000
+    statuses = defaultdict(int)
+    for _, status in samples:
+        statuses[str(status)] += 1
+    errors = sum(n for s, n in statuses.items() if not s.startswith("2"))
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "status_counts": dict(statuses),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 2),
+            "p50": round(float(p50), 2),
+            "p90": round(float(p90), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(latencies.max()), 2),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the AeroGuard backend")
+    parser.add_argument("--profile", choices=list(PROFILES), default="mixed")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of mixed load")
+    parser.add_argument(
+        "--isolation-duration",
+        type=float,
+        default=5,
+        help="Seconds per endpoint for CPU/RSS attribution (0 to skip)",
+    )
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--power-latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.01)
+    parser.add_argument("--power-error-rate", type=float, default=0.01)
+    parser.add_argument("--wait-ready", action="store_true", help="Wait for /readyz")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--report", help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    factories = PROFILES[args.profile]
+    gemini = FakeGemini(
+        args.gemini_latency_ms, args.jitter_ms, args.gemini_error_rate
+    ).start()
+    power = FakePower(args.power_latency_ms, args.jitter_ms, args.power_error_rate).start()
+
+    port = args.port or _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    cache_dir = tempfile.TemporaryDirectory()
+    backend = start_backend(
+        port, args.workers, gemini, power, Path(cache_dir.name) / "cache.sqlite3"
+    )
+    sampler = ProcessSampler(backend.pid)
+    try:
+        wait_until_up(base_url, args.startup_timeout, args.wait_ready)
+        print(f"🚀 Backend up on {base_url}; driving '{args.profile}' at {args.rps} rps")
+
+        with sampler:
+            results, elapsed = drive(
+                base_url, factories, args.rps, args.duration, args.concurrency
+            )
+        n_total = sum(len(v) for v in results.values())
+        report = {
+            "profile": args.profile,
+            "target_rps": args.rps,
+            "achieved_rps": round(n_total / elapsed, 2),
+            "duration_seconds": round(elapsed, 2),
+            "workers": args.workers,
+            # Keyed by request factory, so variants of one path are reported separately
+            "endpoints": {
+                factory_name(f): {
+                    "path": f()[1],
+                    **summarize_latencies(results[factory_name(f)]),
+                }
+                for _, f in factories
+            },
+            "resources": sampler.summary(n_total),
+        }
+
+        # Attribute CPU/RSS to endpoints by driving each one alone at its share of the rate
+        if args.isolation_duration > 0:
+            for weight, factory in factories:
+                rate = max(1.0, args.rps * weight)
+                with sampler:
+                    isolated, _ = drive(
+                        base_url,
+                        [(1.0, factory)],
+                        rate,
+                        args.isolation_duration,
+                        args.concurrency,
+                    )
+                n = sum(len(v) for v in isolated.values())
+                report["endpoints"][factory_name(factory)]["resources"] = sampler.summary(n)
+
+        report["upstreams"] = {"gemini": gemini.stats(), "power": power.stats()}
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+        gemini.stop()
+        power.stop()
+        cache_dir.cleanup()
+
+    print(f"\n{'Request':<20}{'n':>6}{'err%':>7}{'p50':>9}{'p99':>9}{'cpu ms':>9}")
+    for name, stats in report["endpoints"].items():
+        lat = stats["latency_ms"] or {"p50": float("nan"), "p99": float("nan")}
+        cpu = stats.get("resources", {}).get("cpu_ms_per_request")
+        print(
+            f"{name:<20}{stats['count']:>6}{100 * stats['error_rate']:>7.1f}"
+            f"{lat['p50']:>9.1f}{lat['p99']:>9.1f}{str(cpu):>9}"
+        )
+    res = report["resources"]
+    print(
+        f"\n⚡ {report['achieved_rps']} rps, worker CPU {res['cpu_percent']}%, "
+        f"RSS peak {res['rss_mb_peak']} MB"
+    )
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to {os.path.abspath(args.report)}")
+
+
+if __name__ == "__main__":
+    main()
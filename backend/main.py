@@ -1,18 +1,75 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 from pathlib import Path
 import numpy as np
-import tensorflow as tf
-import google.generativeai as genai
+import json
 import os
+import threading
 from dotenv import load_dotenv
 
 from fastapi.middleware.cors import CORSMiddleware
 
+from backend.admission import ConcurrencyLimit, Overloaded, WorkloadPool
+from backend.feature_store import NO2FeatureStore
+from backend.subsystems import (
+    Subsystem,
+    SubsystemAbsent,
+    SubsystemRegistry,
+    SubsystemUnavailable,
+)
+
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+# Set AEROGUARD_WARMUP=0 to skip the background warm-up and load purely on demand
+WARMUP_ON_STARTUP = os.getenv("AEROGUARD_WARMUP", "1") != "0"
+
+# Subsystems that must be ready before /readyz reports the worker as in service.
+# Only core serving by default: a worker without GEMINI_API_KEY should still take
+# traffic, with just the advice endpoints returning 503.
+READY_SUBSYSTEMS = [
+    s.strip()
+    for s in os.getenv("AEROGUARD_READY_SUBSYSTEMS", "no2_model").split(",")
+    if s.strip()
+]
+
+# Seconds between load attempts for a subsystem that failed to initialize
+SUBSYSTEM_RETRY_INTERVAL = float(os.getenv("AEROGUARD_SUBSYSTEM_RETRY", 30))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools are shut down on exit, so a later lifespan (e.g. a reused TestClient) restarts them
+    for pool in pools.values():
+        pool.start()
+    if int(os.getenv("AEROGUARD_WORKERS", 1)) > 1:
+        print(
+            "⚠️ NO2 feature store is per worker: /no2-observations and "
+            "/predict-no2/locations need a single worker"
+        )
+    if WARMUP_ON_STARTUP:
+        subsystems.warm_up_in_background()
+    stop_saving = threading.Event()
+    saver = threading.Thread(
+        target=_save_feature_store_periodically,
+        args=(stop_saving,),
+        name="feature-store-saver",
+        daemon=True,
+    )
+    saver.start()
+    yield
+    stop_saving.set()
+    for pool in pools.values():
+        pool.shutdown()
+    _save_feature_store()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow cross-origin requests from the frontend
 app.add_middleware(
@@ -23,23 +80,227 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Compress larger JSON bodies (e.g. long /city-aqi histories) when clients accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=6)
+
 MODEL_PATH = Path(__file__).resolve().parent / "models" / "no2_pred_10_window_newer.keras"
-if not MODEL_PATH.exists():
-    raise RuntimeError(f"Model file not found: {MODEL_PATH}")
-model = tf.keras.models.load_model(str(MODEL_PATH))
+
+# Snapshot of the per-location NO2 ring buffers, restored on startup and saved
+# every FEATURE_STORE_SAVE_INTERVAL seconds (when changed) and on shutdown
+FEATURE_STORE_PATH = Path(
+    os.getenv(
+        "AEROGUARD_FEATURE_STORE_PATH",
+        str(Path(__file__).resolve().parent / ".cache" / "no2_features.npz"),
+    )
+)
+FEATURE_STORE_SAVE_INTERVAL = float(os.getenv("AEROGUARD_FEATURE_STORE_SAVE_INTERVAL", 60))
+
+
+def _feature_store_path():
+    """Under backend.serve each worker slot snapshots to its own file."""
+    slot = os.getenv("AEROGUARD_WORKER_SLOT")
+    if slot is None:
+        return FEATURE_STORE_PATH
+    path = FEATURE_STORE_PATH
+    return path.with_name(f"{path.stem}.w{slot}{path.suffix}")
+
+
+def _save_feature_store():
+    if not no2_features.ready:
+        return
+    store = no2_features.get()
+    if not store.dirty:
+        return
+    try:
+        store.save(_feature_store_path())
+    except OSError as e:
+        print(f"⚠️ Could not save NO2 feature store: {e}")
+
+
+def _save_feature_store_periodically(stop: threading.Event):
+    # Without this a crashed worker would lose everything since its last clean shutdown
+    while not stop.wait(FEATURE_STORE_SAVE_INTERVAL):
+        _save_feature_store()
+
+
+def _load_no2_model():
+    # TensorFlow is imported here so that importing this module stays fast
+    import tensorflow as tf
+
+    if not MODEL_PATH.exists():
+        raise RuntimeError(f"Model file not found: {MODEL_PATH}")
+    return tf.keras.models.load_model(str(MODEL_PATH))
+
+
+def _warm_up_no2_model(model):
+    # Dummy forward pass so graph tracing happens before the first real request
+    model.predict(np.zeros((1, 10, 1)), verbose=0)
+
+
+def _load_no2_features():
+    path = _feature_store_path()
+    if path.exists():
+        return NO2FeatureStore.load(path)
+    return NO2FeatureStore()
+
+
+def _load_advice_llm():
+    return AeroGuardAI()
+
+
+def _load_aqi_forecaster():
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    return RandomForestRegressor, StandardScaler
+
+
+def _load_aqi_global_model():
+    path = os.getenv("AQI_FORECASTER_PATH") or latest_artifact_path()
+    if path is None:
+        # The documented steady state without an artifact, not a failure
+        raise SubsystemAbsent(f"no forecaster artifact in {FORECASTER_ARTIFACT_DIR}")
+    return load_forecaster_artifact(path)
+
+
+def _warm_up_aqi_forecaster(classes):
+    RandomForestRegressor, StandardScaler = classes
+    X = StandardScaler().fit_transform(np.random.rand(8, 3))
+    RandomForestRegressor(n_estimators=2, random_state=42).fit(X, np.arange(8))
+
+
+subsystems = SubsystemRegistry()
+no2_model = subsystems.register(
+    Subsystem(
+        "no2_model",
+        _load_no2_model,
+        _warm_up_no2_model,
+        retry_interval=SUBSYSTEM_RETRY_INTERVAL,
+    )
+)
+no2_features = subsystems.register(Subsystem("no2_features", _load_no2_features))
+advice_llm = subsystems.register(
+    Subsystem("advice_llm", _load_advice_llm, retry_interval=SUBSYSTEM_RETRY_INTERVAL)
+)
+aqi_forecaster = subsystems.register(
+    Subsystem("aqi_forecaster", _load_aqi_forecaster, _warm_up_aqi_forecaster)
+)
+# Offline-trained model from backend.train_aqi_forecaster; when no artifact exists
+# /city-aqi falls back to training a per-request model with aqi_forecaster. A missing
+# artifact is rechecked at most every AQI_FORECASTER_RECHECK seconds, so a newly
+# trained one is picked up without a restart
+aqi_global_model = subsystems.register(
+    Subsystem(
+        "aqi_global_model",
+        _load_aqi_global_model,
+        retry_interval=float(os.getenv("AQI_FORECASTER_RECHECK", 300)),
+    )
+)
+
+
+# Separate bounded executors per workload class: (workers, max queued)
+pools = {
+    "cpu": WorkloadPool(
+        "cpu",
+        int(os.getenv("AEROGUARD_CPU_WORKERS", 2)),
+        int(os.getenv("AEROGUARD_CPU_QUEUE", 64)),
+    ),
+    "training": WorkloadPool(
+        "training",
+        int(os.getenv("AEROGUARD_TRAINING_WORKERS", 1)),
+        int(os.getenv("AEROGUARD_TRAINING_QUEUE", 4)),
+    ),
+    "io": WorkloadPool(
+        "io",
+        int(os.getenv("AEROGUARD_IO_WORKERS", 16)),
+        int(os.getenv("AEROGUARD_IO_QUEUE", 32)),
+    ),
+}
+
+# Per-endpoint concurrency limits as a share of their pool's capacity; requests
+# beyond these get a 429 before the pool itself has to shed with a 503. The io
+# pool is split between the two advice endpoints and /city-aqi's io-side work
+# (cache lookups, rendering and NASA POWER fetches).
+endpoint_limits = {
+    "predict-no2": ConcurrencyLimit.share_of("predict-no2", pools["cpu"], 0.75),
+    "city-aqi": ConcurrencyLimit.share_of("city-aqi", pools["training"], 0.8),
+    "city-aqi-io": ConcurrencyLimit.share_of("city-aqi-io", pools["io"], 0.25),
+    "wildfire-advice": ConcurrencyLimit.share_of("wildfire-advice", pools["io"], 0.5),
+    "pollution-advice": ConcurrencyLimit.share_of("pollution-advice", pools["io"], 0.25),
+}
+
+
+@app.exception_handler(SubsystemUnavailable)
+def subsystem_unavailable_handler(request, exc: SubsystemUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 class NO2Input(BaseModel):
     values: list[float] = Field(..., min_length=10, max_length=10)
 
 
+class NO2Observation(BaseModel):
+    location: str
+    value: float
+
+
+class NO2ObservationBatch(BaseModel):
+    observations: list[NO2Observation] = Field(..., min_length=1)
+
+
+class NO2LocationsInput(BaseModel):
+    locations: list[str] = Field(..., min_length=1, max_length=512)
+
+
 @app.get("/")
 def root():
     return {"message": "NO2 prediction service"}
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up, whatever state its subsystems are in."""
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "subsystems": subsystems.status(),
+        "caches": {
+            "weather": weather_cache.stats(),
+            "forecast": forecast_cache.stats(),
+        },
+        "pools": {name: pool.status() for name, pool in pools.items()},
+        "endpoints": {name: limit.status() for name, limit in endpoint_limits.items()},
+    }
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: every subsystem in READY_SUBSYSTEMS has finished initializing."""
+    status = subsystems.status()
+    ready = all(status[name]["state"] == "ready" for name in READY_SUBSYSTEMS)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "subsystems": status},
+    )
+
+
 @app.post("/predict-no2")
-def predict_no2(payload: NO2Input):
+async def predict_no2(payload: NO2Input):
+    async with endpoint_limits["predict-no2"]:
+        return await pools["cpu"].run(_predict_no2, payload)
+
+
+def _predict_no2(payload: NO2Input):
+    model = no2_model.get()
     arr = np.array(payload.values, dtype=float)
     input_data = arr.reshape(1, 10, 1)
     pred = model.predict(input_data, verbose=0)
@@ -47,14 +308,51 @@ def predict_no2(payload: NO2Input):
     return {"prediction": prediction}
 
 
+@app.post("/no2-observations")
+def ingest_no2_observations(payload: NO2ObservationBatch):
+    """Append the newest NO2 values (e.g. from TEMPO processing) to the feature store."""
+    store = no2_features.get()
+    store.push_many((o.location, o.value) for o in payload.observations)
+    return {"ingested": len(payload.observations), "locations": len(store)}
+
+
+@app.post("/predict-no2/locations")
+async def predict_no2_locations(payload: NO2LocationsInput):
+    async with endpoint_limits["predict-no2"]:
+        return await pools["cpu"].run(_predict_no2_locations, payload)
+
+
+def _predict_no2_locations(payload: NO2LocationsInput):
+    model = no2_model.get()
+    try:
+        batch = no2_features.get().batch(payload.locations)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown location: {e.args[0]}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    preds = np.asarray(model.predict(batch, verbose=0)).reshape(len(payload.locations))
+    return {"predictions": dict(zip(payload.locations, preds.tolist()))}
+
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# e.g. http://127.0.0.1:9001 to talk to a local stand-in over REST (see backend.loadtest)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 
 
 class AeroGuardAI:
     def __init__(self):
         if not GEMINI_API_KEY:
             raise RuntimeError("GEMINI_API_KEY environment variable not set")
-        genai.configure(api_key=GEMINI_API_KEY)
+        import google.generativeai as genai
+
+        if GEMINI_API_ENDPOINT:
+            genai.configure(
+                api_key=GEMINI_API_KEY,
+                transport="rest",
+                client_options={"api_endpoint": GEMINI_API_ENDPOINT},
+            )
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel("gemini-2.5-flash")
 
     def _clean_response(self, text: str) -> str:
@@ -133,9 +431,6 @@ Keep under 200 words. Suggest real Upstate SC locations.
         return self._clean_response(resp.text)
 
 
-ai_helper = AeroGuardAI()
-
-
 # Example request bodies:
 # POST /wildfire-advice
 # {
@@ -163,7 +458,13 @@ class PollutionAdviceRequest(BaseModel):
 
 
 @app.post("/wildfire-advice")
-def wildfire_advice(payload: WildfireAdviceRequest):
+async def wildfire_advice(payload: WildfireAdviceRequest):
+    async with endpoint_limits["wildfire-advice"]:
+        return await pools["io"].run(_wildfire_advice, payload)
+
+
+def _wildfire_advice(payload: WildfireAdviceRequest):
+    ai_helper = advice_llm.get()
     try:
         return {
             "advice": ai_helper.get_wildfire_advice(
@@ -175,8 +476,13 @@ def wildfire_advice(payload: WildfireAdviceRequest):
 
 
 @app.post("/pollution-advice")
-def pollution_advice(payload: PollutionAdviceRequest):
+async def pollution_advice(payload: PollutionAdviceRequest):
+    async with endpoint_limits["pollution-advice"]:
+        return await pools["io"].run(_pollution_advice, payload)
 
+
+def _pollution_advice(payload: PollutionAdviceRequest):
+    ai_helper = advice_llm.get()
     try:
         return {
             "advice": ai_helper.get_pollution_advice(
@@ -187,96 +493,166 @@ def pollution_advice(payload: PollutionAdviceRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
 import warnings
 from pydantic import BaseModel, Field
 
+from backend.nasa_power import (
+    NASA_POWER_BASE_URL,
+    WEATHER_PARAMS,
+    PowerAPIError,
+    fetch_power_daily,
+    weather_cache,
+)
+from backend.shared_cache import SharedCache
+from backend.aqi_features import (
+    SC_CITIES,
+    WEATHER_DEFAULTS,
+    build_prediction_features,
+    calculate_aqi_array,
+    calculate_aqi_from_weather,
+    fill_missing_weather,
+    power_to_frame,
+)
+from backend.train_aqi_forecaster import (
+    ARTIFACT_DIR as FORECASTER_ARTIFACT_DIR,
+    latest_artifact_path,
+    load_forecaster_artifact,
+)
+from backend.aqi_online import load_online_forecaster
+
 warnings.filterwarnings("ignore")
 
-# NASA Power API Configuration
-NASA_POWER_BASE_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
-
-# Weather parameters from NASA Power API
-WEATHER_PARAMS = [
-    "T2M",  # Temperature at 2 meters (°C)
-    "T2M_MAX",  # Max Temperature (°C)
-    "T2M_MIN",  # Min Temperature (°C)
-    "RH2M",  # Relative Humidity (%)
-    "PRECTOTCORR",  # Precipitation (mm/day)
-    "WS10M",  # Wind Speed at 10m (m/s)
-    "PS",  # Surface Pressure (kPa)
-]
+# "online" serves from the incrementally updated per-city forecasters
+# (backend.aqi_online); anything else uses the global artifact when present
+AQI_FORECAST_MODE = os.getenv("AQI_FORECAST_MODE", "auto")
 
-# South Carolina cities with coordinates
-SC_CITIES = {
-    "Charleston": {"lat": 32.7765, "lon": -79.9311},
-    "Columbia": {"lat": 34.0007, "lon": -81.0348},
-    "Greenville": {"lat": 34.8526, "lon": -82.3940},
-    "Myrtle Beach": {"lat": 33.6891, "lon": -78.8867},
-    "Spartanburg": {"lat": 34.9496, "lon": -81.9320},
-    "Florence": {"lat": 34.1954, "lon": -79.7626},
-    "Rock Hill": {"lat": 34.9249, "lon": -81.0251},
-    "Sumter": {"lat": 33.9204, "lon": -80.3414},
-    "Anderson": {"lat": 34.5034, "lon": -82.6501},
-    "Clemson": {"lat": 34.6834, "lon": -82.8374},
-}
+# Forecasts are shared across workers; they only change when the day rolls over
+forecast_cache = SharedCache(
+    "city_forecast", ttl_seconds=float(os.getenv("AEROGUARD_FORECAST_TTL", 3600))
+)
 
 
-def calculate_aqi_from_weather(weather_row):
-    """
-    Simple AQI estimation from weather parameters
-    Based on empirical relationships between weather and air quality
-    """
-    temp = weather_row.get("T2M", 20)
-    humidity = weather_row.get("RH2M", 50)
-    wind_speed = weather_row.get("WS10M", 5)
-    precipitation = weather_row.get("PRECTOTCORR", 0)
-    pressure = weather_row.get("PS", 101.3)
-
-    # Check for invalid/missing data (NASA POWER API uses -999 for missing data)
-    if (
-        temp < -900
-        or humidity < -900
-        or wind_speed < -900
-        or precipitation < -900
-        or pressure < -900
-    ):
-        # Return a reasonable default for missing data rather than an extreme value
-        return 50  # Moderate AQI is a reasonable default
-
-    # Base AQI calculation
-    base_aqi = 50  # Moderate baseline
-
-    # Weather effects on AQI
-    temp_effect = (temp - 20) * 0.8  # Higher temp = higher AQI
-    wind_effect = -(wind_speed - 5) * 2.5  # Higher wind = lower AQI
-    humidity_effect = abs(humidity - 55) * 0.3  # Extreme humidity = higher AQI
-    precip_effect = -precipitation * 3  # Rain = lower AQI
-    pressure_effect = (pressure - 101.3) * 0.5  # High pressure = higher AQI
-
-    # Calculate final AQI
-    aqi = (
-        base_aqi
-        + temp_effect
-        + wind_effect
-        + humidity_effect
-        + precip_effect
-        + pressure_effect
-    )
+def _global_aqi_model():
+    """The pre-trained forecaster artifact, or None to fall back to per-request training."""
+    try:
+        return aqi_global_model.get()
+    except SubsystemUnavailable:
+        return None
+
+
+def _online_aqi_forecaster(city_name):
+    if AQI_FORECAST_MODE != "online":
+        return None
+    forecaster = load_online_forecaster(city_name)
+    if forecaster is None or not forecaster.window_full or forecaster.n_updates == 0:
+        return None
+    return forecaster
+
+
+def _train_and_predict_per_request(df, valid_df, prediction_date):
+    """Fit a RandomForest on this city's recent history and predict prediction_date."""
+    # Train simple prediction model
+    print("🤖 Training prediction model...")
+
+    # Prepare features and targets
+    features = []
+    targets = []
+
+    # Use sliding window for training (increased from 3 to 5 for more stability)
+    window_size = min(5, len(valid_df) - 1)
+
+    for i in range(window_size, len(valid_df)):
+        # Features: recent AQI + weather averages
+        feature_row = []
+
+        # Recent AQI values
+        for j in range(window_size):
+            feature_row.append(valid_df.iloc[i - window_size + j]["aqi"])
+
+        # Recent weather averages
+        recent_weather = valid_df.iloc[i - window_size : i]
+        for param in WEATHER_PARAMS:
+            if param in valid_df.columns:
+                feature_row.append(recent_weather[param].mean())
+
+        # Temporal features
+        current_date = df.iloc[i]["date"]
+        feature_row.append(current_date.timetuple().tm_yday)  # Day of year
+        feature_row.append(current_date.weekday())  # Day of week
+
+        features.append(feature_row)
+        targets.append(valid_df.iloc[i]["aqi"])
+
+    # Train model if we have enough data
+    if len(features) >= 3:  # Require at least 3 samples for better stability
+        X = np.array(features)
+        y = np.array(targets)
+
+        # Use RandomForest for prediction
+        RandomForestRegressor, StandardScaler = aqi_forecaster.get()
+        model = RandomForestRegressor(n_estimators=50, random_state=42)
+        scaler = StandardScaler()
+
+        X_scaled = scaler.fit_transform(X)
+        model.fit(X_scaled, y)
+
+        # Prepare features for prediction
+        prediction_features = []
+
+        # Use last window_size days for prediction (from valid data)
+        valid_recent = valid_df.tail(window_size)
+        recent_aqi = valid_recent["aqi"].values
+
+        # If we don't have enough recent valid data, use all available
+        if len(recent_aqi) < window_size:
+            padding_needed = window_size - len(recent_aqi)
+            recent_aqi = np.pad(recent_aqi, (padding_needed, 0), "edge")
+
+        for aqi_val in recent_aqi:
+            prediction_features.append(aqi_val)
+
+        # Recent weather averages (using valid data)
+        for param in WEATHER_PARAMS:
+            if param in valid_df.columns:
+                # Calculate mean of valid values only
+                param_values = valid_recent[param].values
+                valid_values = param_values[param_values > -900]
+                if len(valid_values) > 0:
+                    prediction_features.append(valid_values.mean())
+                else:
+                    # Use a reasonable default if no valid values
+                    prediction_features.append(WEATHER_DEFAULTS.get(param, 0))
+            else:
+                prediction_features.append(0)
+
+        # Temporal features for prediction date
+        prediction_features.append(prediction_date.timetuple().tm_yday)
+        prediction_features.append(prediction_date.weekday())
 
-    # Add realistic variation
-    aqi += np.random.normal(0, 8)
+        # Make prediction
+        X_pred = np.array([prediction_features])
+        X_pred_scaled = scaler.transform(X_pred)
+        predicted_aqi = model.predict(X_pred_scaled)[0]
+        method = "Random Forest"
+
+    else:
+        # Fallback: simple trend-based prediction
+        recent_aqi = df["aqi"].tail(3).values
+        trend = (
+            (recent_aqi[-1] - recent_aqi[0]) / len(recent_aqi)
+            if len(recent_aqi) > 1
+            else 0
+        )
+        predicted_aqi = recent_aqi[-1] + trend
+        method = "Simple Trend"
 
-    # Keep within realistic bounds
-    return max(10, min(150, aqi))
+    return predicted_aqi, method
 
 
-def predict_aqi_from_date(city_name, target_date, days_back=10):
+def predict_aqi_from_date(city_name, target_date, days_back=10, weather_data=None):
     """
     STANDALONE FUNCTION: Fetch weather data for previous N days from a specific date and predict next day's AQI
 
@@ -286,6 +662,7 @@ def predict_aqi_from_date(city_name, target_date, days_back=10):
     - city_name: Name of South Carolina city (must be in SC_CITIES)
     - target_date: Date to predict from (string 'YYYY-MM-DD' or datetime object)
     - days_back: Number of previous days to fetch (default 10)
+    - weather_data: Already-fetched NASA POWER block for that range (skips the fetch)
 
     Returns:
     - Dictionary with prediction results and historical data DataFrame
@@ -321,50 +698,27 @@ def predict_aqi_from_date(city_name, target_date, days_back=10):
     # Get city coordinates
     coords = SC_CITIES[city_name]
 
-    # Prepare NASA Power API request
-    url = NASA_POWER_BASE_URL
-    params = {
-        "parameters": ",".join(WEATHER_PARAMS),
-        "community": "RE",
-        "longitude": coords["lon"],
-        "latitude": coords["lat"],
-        "start": start_date.strftime("%Y%m%d"),
-        "end": end_date.strftime("%Y%m%d"),
-        "format": "JSON",
-    }
-
     try:
-        print(f"📡 Fetching historical weather data for {city_name}...")
-        response = requests.get(url, params=params, timeout=30)
-
-        if response.status_code != 200:
-            return {"error": f"NASA Power API error: HTTP {response.status_code}"}
-
-        data = response.json()
-        weather_data = data["properties"]["parameter"]
-
-        # Build historical dataframe
-        records = []
-        available_dates = list(weather_data["T2M"].keys())
-
-        for date_str in available_dates:
-            date_obj = datetime.strptime(date_str, "%Y%m%d").date()
-
-            # Collect weather parameters for this date
-            weather_row = {"date": date_obj}
-            for param in WEATHER_PARAMS:
-                if param in weather_data and date_str in weather_data[param]:
-                    weather_row[param] = weather_data[param][date_str]
-
-            # Calculate AQI from weather parameters
-            aqi = calculate_aqi_from_weather(weather_row)
-            weather_row["aqi"] = aqi
+        if weather_data is None:
+            print(f"📡 Fetching historical weather data for {city_name}...")
+            try:
+                weather_data = fetch_power_daily(
+                    coords["lat"], coords["lon"], start_date, end_date
+                )
+            except PowerAPIError as e:
+                return {"error": str(e)}
 
-            records.append(weather_row)
+        online = _online_aqi_forecaster(city_name)
+        global_model = _global_aqi_model() if online is None else None
 
-        # Create DataFrame
-        df = pd.DataFrame(records)
-        df = df.sort_values("date").reset_index(drop=True)
+        # Build historical dataframe and estimate AQI for every day
+        df = power_to_frame(weather_data)
+        if online is not None or global_model is not None:
+            # Same preprocessing as training (aqi_features): drop days POWER hasn't
+            # processed yet, then fill remaining -999 gaps (e.g. a lagging
+            # PRECTOTCORR) before AQI labels and features are computed
+            df = fill_missing_weather(df[df["T2M"] > -900].reset_index(drop=True))
+        df["aqi"] = calculate_aqi_array(df, np.random)
 
         print(f"✅ Retrieved {len(df)} days of historical data")
 
@@ -384,120 +738,22 @@ def predict_aqi_from_date(city_name, target_date, days_back=10):
                 df.loc[df[col] < -900, col] = (
                     df.loc[df[col] > -900, col].mean()
                     if sum(df[col] > -900) > 0
-                    else {
-                        "T2M": 20,
-                        "T2M_MAX": 25,
-                        "T2M_MIN": 15,
-                        "RH2M": 50,
-                        "PRECTOTCORR": 0,
-                        "WS10M": 5,
-                        "PS": 101.3,
-                    }.get(col, 0)
+                    else WEATHER_DEFAULTS.get(col, 0)
                 )
             valid_df = df
 
-        # Train simple prediction model
-        print("🤖 Training prediction model...")
-
-        # Prepare features and targets
-        features = []
-        targets = []
-
-        # Use sliding window for training (increased from 3 to 5 for more stability)
-        window_size = min(5, len(valid_df) - 1)
-
-        for i in range(window_size, len(valid_df)):
-            # Features: recent AQI + weather averages
-            feature_row = []
-
-            # Recent AQI values
-            for j in range(window_size):
-                feature_row.append(valid_df.iloc[i - window_size + j]["aqi"])
-
-            # Recent weather averages
-            recent_weather = valid_df.iloc[i - window_size : i]
-            for param in WEATHER_PARAMS:
-                if param in valid_df.columns:
-                    feature_row.append(recent_weather[param].mean())
-
-            # Temporal features
-            current_date = df.iloc[i]["date"]
-            feature_row.append(current_date.timetuple().tm_yday)  # Day of year
-            feature_row.append(current_date.weekday())  # Day of week
-
-            features.append(feature_row)
-            targets.append(valid_df.iloc[i]["aqi"])
-
-        # Train model if we have enough data
-        if len(features) >= 3:  # Require at least 3 samples for better stability
-            X = np.array(features)
-            y = np.array(targets)
-
-            # Use RandomForest for prediction
-            model = RandomForestRegressor(n_estimators=50, random_state=42)
-            scaler = StandardScaler()
-
-            X_scaled = scaler.fit_transform(X)
-            model.fit(X_scaled, y)
-
-            # Prepare features for prediction
-            prediction_features = []
-
-            # Use last window_size days for prediction (from valid data)
-            valid_recent = valid_df.tail(window_size)
-            recent_aqi = valid_recent["aqi"].values
-
-            # If we don't have enough recent valid data, use all available
-            if len(recent_aqi) < window_size:
-                padding_needed = window_size - len(recent_aqi)
-                recent_aqi = np.pad(recent_aqi, (padding_needed, 0), "edge")
-
-            for aqi_val in recent_aqi:
-                prediction_features.append(aqi_val)
-
-            # Recent weather averages (using valid data)
-            for param in WEATHER_PARAMS:
-                if param in valid_df.columns:
-                    # Calculate mean of valid values only
-                    param_values = valid_recent[param].values
-                    valid_values = param_values[param_values > -900]
-                    if len(valid_values) > 0:
-                        prediction_features.append(valid_values.mean())
-                    else:
-                        # Use a reasonable default if no valid values
-                        defaults = {
-                            "T2M": 20,
-                            "T2M_MAX": 25,
-                            "T2M_MIN": 15,
-                            "RH2M": 50,
-                            "PRECTOTCORR": 0,
-                            "WS10M": 5,
-                            "PS": 101.3,
-                        }
-                        prediction_features.append(defaults.get(param, 0))
-                else:
-                    prediction_features.append(0)
-
-            # Temporal features for prediction date
-            prediction_features.append(prediction_date.timetuple().tm_yday)
-            prediction_features.append(prediction_date.weekday())
-
-            # Make prediction
-            X_pred = np.array([prediction_features])
-            X_pred_scaled = scaler.transform(X_pred)
-            predicted_aqi = model.predict(X_pred_scaled)[0]
-            method = "Random Forest"
-
+        if online is not None:
+            predicted_aqi = online.predict(prediction_date)
+            method = f"Online SGD (through {online.last_date})"
+        elif global_model is not None:
+            # Pre-trained model: just build one feature row and predict
+            X_pred = build_prediction_features(valid_df, city_name, prediction_date)
+            predicted_aqi = float(global_model["model"].predict(X_pred)[0])
+            method = f"Global Random Forest ({global_model['version']})"
         else:
-            # Fallback: simple trend-based prediction
-            recent_aqi = df["aqi"].tail(3).values
-            trend = (
-                (recent_aqi[-1] - recent_aqi[0]) / len(recent_aqi)
-                if len(recent_aqi) > 1
-                else 0
+            predicted_aqi, method = _train_and_predict_per_request(
+                df, valid_df, prediction_date
             )
-            predicted_aqi = recent_aqi[-1] + trend
-            method = "Simple Trend"
 
         # Calculate historical AQI statistics for more reasonable bounds
         valid_aqi = valid_df["aqi"].values
@@ -608,28 +864,218 @@ def run_standalone_examples():
     return result1, result2
 
 
+# Content types /city-aqi can negotiate through the Accept header
+COLUMNAR_MEDIA_TYPE = "application/vnd.aeroguard.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
 class CityAQIRequest(BaseModel):
     city: str = Field(..., description="City name (e.g., Greenville)")
     days_back: int = Field(10, ge=2, le=30, description="Number of prior days to use")
 
 
-@app.post("/city-aqi")
-def get_city_aqi(payload: CityAQIRequest):
-    target_date = datetime.utcnow().date() + timedelta(days=1)
-    result = predict_aqi_from_date(payload.city, target_date, days_back=100)
+def _historical_columns(df, days_back):
+    """Last days_back + 1 rows of the history as {field: [values]}."""
+    tail = df.tail(min(len(df), days_back + 1))
+    columns = {
+        "date": pd.to_datetime(tail["date"]).dt.strftime("%Y-%m-%d").tolist(),
+        "aqi": tail["aqi"].round(1).tolist(),
+    }
+    for p in WEATHER_PARAMS:
+        if p in tail.columns:
+            columns[p] = tail[p].tolist()
+    return columns
+
+
+def _header_qvalues(header):
+    """Parse an Accept/Accept-Encoding header into {token: q}."""
+    qvalues = {}
+    for part in header.split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[token.lower()] = q
+    return qvalues
+
+
+def _negotiate_media_type(accept):
+    """Arrow or columnar JSON if explicitly preferred, otherwise plain JSON."""
+    qvalues = _header_qvalues(accept)
+    json_q = qvalues.get("application/json", 0.0)
+    # Ties go to Arrow, then columnar, matching the order they were added
+    best = max(
+        (ARROW_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE), key=lambda t: qvalues.get(t, 0.0)
+    )
+    best_q = qvalues.get(best, 0.0)
+    if best_q > 0 and best_q >= json_q:
+        return best
+    return "application/json"
+
+
+def _accepts_brotli(accept_encoding):
+    qvalues = _header_qvalues(accept_encoding)
+    return qvalues.get("br", qvalues.get("*", 0.0)) > 0
+
+
+def _arrow_response(result, columns):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(
+            status_code=406, detail="Arrow responses require pyarrow on the server"
+        )
+    table = pa.table(columns)
+    # The forecast summary travels in the schema metadata next to the history
+    table = table.replace_schema_metadata(
+        {"aeroguard.forecast": json.dumps(jsonable_encoder(result))}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(
+        content=sink.getvalue().to_pybytes(),
+        media_type=ARROW_MEDIA_TYPE,
+        headers={"Vary": "Accept"},
+    )
+
+
+def _brotli_response(content, media_type):
+    """Brotli-encode a JSON body if the optional brotli package is installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    return Response(
+        content=brotli.compress(body, quality=5),
+        media_type=media_type,
+        headers={"Content-Encoding": "br", "Vary": "Accept, Accept-Encoding"},
+    )
+
+
+# History the /city-aqi forecast is computed from
+CITY_FORECAST_DAYS_BACK = 100
+
+# In-flight forecast computations by cache key, so concurrent misses for the same
+# city and day share one fetch and fit. Only touched from the event loop thread.
+_inflight_forecasts: dict[str, asyncio.Future] = {}
+
+
+def _fetch_city_weather(city, target_date):
+    coords = SC_CITIES[city]
+    start_date = target_date - timedelta(days=CITY_FORECAST_DAYS_BACK)
+    try:
+        return fetch_power_daily(coords["lat"], coords["lon"], start_date, target_date)
+    except PowerAPIError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing data: {e}")
+
+
+def _compute_city_forecast(city, target_date, cache_key, weather_data):
+    result = predict_aqi_from_date(
+        city, target_date, days_back=CITY_FORECAST_DAYS_BACK, weather_data=weather_data
+    )
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
+    forecast_cache.set(cache_key, result)
+    return result
+
+
+async def _city_forecast(city, target_date, cache_key):
+    # Outbound I/O on the io pool, so a slow NASA POWER call never holds a
+    # training worker; only the fit/predict step runs on the training pool
+    async with endpoint_limits["city-aqi-io"]:
+        weather_data = await pools["io"].run(_fetch_city_weather, city, target_date)
+    async with endpoint_limits["city-aqi"]:
+        return await pools["training"].run(
+            _compute_city_forecast, city, target_date, cache_key, weather_data
+        )
+
+
+def _shared_city_forecast(city, target_date, cache_key) -> asyncio.Future:
+    task = _inflight_forecasts.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_city_forecast(city, target_date, cache_key))
+        _inflight_forecasts[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_forecasts.pop(cache_key, None))
+    # Shielded so one client disconnecting doesn't cancel everyone else's result
+    return asyncio.shield(task)
+
+
+@app.post("/city-aqi")
+async def get_city_aqi(payload: CityAQIRequest, request: Request):
+    """
+    Forecast for tomorrow plus recent history.
+
+    The history is returned as one object per day by default. Clients can ask
+    for one array per field with `Accept: application/vnd.aeroguard.columnar+json`,
+    or for an Arrow IPC stream with `Accept: application/vnd.apache.arrow.stream`.
+    JSON bodies are gzip- or brotli-compressed per Accept-Encoding.
+    """
+    if payload.city not in SC_CITIES:
+        available_cities = ", ".join(SC_CITIES.keys())
+        raise HTTPException(
+            status_code=400,
+            detail=f"City '{payload.city}' not found. Available cities: {available_cities}",
+        )
+    media_type = _negotiate_media_type(request.headers.get("accept", ""))
+    use_brotli = _accepts_brotli(request.headers.get("accept-encoding", ""))
+    target_date = datetime.utcnow().date() + timedelta(days=1)
+    cache_key = f"{payload.city}|{target_date}"
+    # The SQLite lookup, unpickling and encoding all block, so even cache hits
+    # run on the io pool rather than the event loop
+    async with endpoint_limits["city-aqi-io"]:
+        response = await pools["io"].run(
+            _render_cached_city_aqi, cache_key, payload.days_back, media_type, use_brotli
+        )
+    if response is not None:
+        return response
+    # Only cache misses fetch weather and run/fit the forecaster
+    result = await _shared_city_forecast(payload.city, target_date, cache_key)
+    async with endpoint_limits["city-aqi-io"]:
+        return await pools["io"].run(
+            _render_city_aqi, result, payload.days_back, media_type, use_brotli
+        )
+
+
+def _render_cached_city_aqi(cache_key, days_back, media_type, use_brotli):
+    result = forecast_cache.get(cache_key)
+    if result is None:
+        return None
+    return _render_city_aqi(result, days_back, media_type, use_brotli)
+
+
+def _render_city_aqi(result, days_back, media_type, use_brotli):
+    result = dict(result)
 
     df = result.pop("historical_data", None)
-    if df is not None:
-        hist_records = []
-        tail_n = min(len(df), payload.days_back + 1)
-        for r in df.tail(tail_n).itertuples():
-            rec = {"date": r.date.strftime("%Y-%m-%d"), "aqi": round(r.aqi, 1)}
-            for p in WEATHER_PARAMS:
-                if p in df.columns:
-                    rec[p] = getattr(r, p)
-            hist_records.append(rec)
-        result["historical_data"] = hist_records
+    columns = _historical_columns(df, days_back) if df is not None else {}
 
-    return result
+    if media_type == ARROW_MEDIA_TYPE:
+        return _arrow_response(result, columns)
+
+    if df is not None:
+        if media_type == COLUMNAR_MEDIA_TYPE:
+            result["historical_data"] = columns
+        else:
+            fields = list(columns)
+            result["historical_data"] = [
+                dict(zip(fields, row)) for row in zip(*columns.values())
+            ]
+
+    if use_brotli:
+        response = _brotli_response(result, media_type)
+        if response is not None:
+            return response
+    return JSONResponse(
+        content=jsonable_encoder(result), media_type=media_type, headers={"Vary": "Accept"}
+    )
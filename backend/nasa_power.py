@@ -0,0 +1,162 @@
+"""
+NASA POWER daily weather client.
+
+Responses are cached in the shared cross-process cache so every worker reuses
+the same fetch for a given location and date range. Long ranges are fetched as
+parallel per-year chunks and parsed straight into NumPy arrays.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+
+from backend.shared_cache import SharedCache
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional, the stdlib decoder works too
+    import json
+
+    _json_loads = json.loads
+
+# NASA Power API Configuration (overridable to point at a stand-in server)
+NASA_POWER_BASE_URL = os.getenv(
+    "NASA_POWER_BASE_URL", "https://power.larc.nasa.gov/api/temporal/daily/point"
+)
+
+# Weather parameters from NASA Power API
+WEATHER_PARAMS = [
+    "T2M",  # Temperature at 2 meters (°C)
+    "T2M_MAX",  # Max Temperature (°C)
+    "T2M_MIN",  # Min Temperature (°C)
+    "RH2M",  # Relative Humidity (%)
+    "PRECTOTCORR",  # Precipitation (mm/day)
+    "WS10M",  # Wind Speed at 10m (m/s)
+    "PS",  # Surface Pressure (kPa)
+]
+
+weather_cache = SharedCache(
+    "power_daily", ttl_seconds=float(os.getenv("AEROGUARD_WEATHER_TTL", 6 * 3600))
+)
+
+# At most this many chunk requests are in flight for one long-range fetch
+MAX_PARALLEL_CHUNKS = 4
+
+# POWER's marker for missing values
+MISSING_VALUE = -999.0
+
+# Ranges that ended this long ago are no longer revised by POWER and are kept for
+# HISTORY_TTL instead of the short default (training pulls years of them)
+SETTLED_AFTER = timedelta(days=7)
+HISTORY_TTL = 30 * 24 * 3600
+
+
+class PowerAPIError(RuntimeError):
+    """Raised when the NASA POWER API returns a non-200 response."""
+
+
+def fetch_power_daily(lat, lon, start_date, end_date, offline=False):
+    """
+    Fetch daily WEATHER_PARAMS for a point, going through the shared cache.
+
+    Returns the raw `properties.parameter` block: {param: {"YYYYMMDD": value}}.
+    With offline=True a cache miss raises PowerAPIError instead of hitting the API.
+    """
+    start = start_date.strftime("%Y%m%d")
+    end = end_date.strftime("%Y%m%d")
+    key = f"{lat:.4f},{lon:.4f}|{start}|{end}"
+
+    def _fetch():
+        params = {
+            "parameters": ",".join(WEATHER_PARAMS),
+            "community": "RE",
+            "longitude": lon,
+            "latitude": lat,
+            "start": start,
+            "end": end,
+            "format": "JSON",
+        }
+        response = requests.get(NASA_POWER_BASE_URL, params=params, timeout=30)
+        if response.status_code != 200:
+            raise PowerAPIError(f"NASA Power API error: HTTP {response.status_code}")
+        return _json_loads(response.content)["properties"]["parameter"]
+
+    cached = weather_cache.get(key)
+    if cached is not None:
+        return cached
+    if offline:
+        raise PowerAPIError(f"NASA Power data for {key} is not cached")
+    parameters = _fetch()
+    settled = end_date <= date.today() - SETTLED_AFTER
+    weather_cache.set(key, parameters, ttl_seconds=HISTORY_TTL if settled else None)
+    return parameters
+
+
+def parse_power_parameters(parameters, dtype=np.float32):
+    """
+    Parse a `properties.parameter` block in one pass.
+
+    Returns (dates, values): a datetime64[D] index and a (n_days, len(WEATHER_PARAMS))
+    matrix. Parameters missing from the block are filled with MISSING_VALUE.
+    """
+    keys = list(parameters["T2M"].keys())
+    n = len(keys)
+    # YYYYMMDD keys -> integers -> datetime64 arithmetic, no per-date strptime
+    ymd = np.array(keys, dtype="U8").astype(np.int64)
+    months = (ymd // 10000 - 1970) * 12 + (ymd // 100 % 100 - 1)
+    dates = months.astype("datetime64[M]").astype("datetime64[D]") + (ymd % 100 - 1)
+
+    values = np.full((n, len(WEATHER_PARAMS)), MISSING_VALUE, dtype=dtype)
+    for j, param in enumerate(WEATHER_PARAMS):
+        series = parameters.get(param)
+        if not series:
+            continue
+        # POWER returns every parameter over the same dates in the same order; the
+        # check must be ordered (dict key views compare as sets)
+        if list(series) == keys:
+            values[:, j] = np.fromiter(series.values(), dtype=dtype, count=n)
+        else:
+            values[:, j] = [series.get(k, MISSING_VALUE) for k in keys]
+    return dates, values
+
+
+def _year_chunks(start_date, end_date):
+    """Split [start_date, end_date] at calendar-year boundaries."""
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(date(chunk_start.year, 12, 31), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def fetch_power_arrays(lat, lon, start_date, end_date, offline=False, fetch=None):
+    """
+    Fetch a (possibly multi-year) range as (dates, values) arrays.
+
+    The range is split into calendar-year chunks that are fetched in parallel
+    and cached individually, so overlapping ranges reuse each other's years.
+    `fetch` replaces fetch_power_daily as the per-chunk source (e.g. synthetic data).
+    """
+    if fetch is None:
+
+        def fetch(lat, lon, start, end):
+            return fetch_power_daily(lat, lon, start, end, offline=offline)
+
+    chunks = _year_chunks(start_date, end_date)
+    if len(chunks) == 1:
+        blocks = [fetch(lat, lon, *chunks[0])]
+    else:
+        with ThreadPoolExecutor(min(len(chunks), MAX_PARALLEL_CHUNKS)) as pool:
+            blocks = list(pool.map(lambda c: fetch(lat, lon, *c), chunks))
+
+    parsed = [parse_power_parameters(block) for block in blocks]
+    dates = np.concatenate([d for d, _ in parsed])
+    values = np.concatenate([v for _, v in parsed])
+    return dates, values
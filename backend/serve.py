@@ -0,0 +1,125 @@
+"""
+Multi-worker pre-fork server for the AeroGuard backend.
+
+    python -m backend.serve --workers 4 --port 8000
+
+Unlike `uvicorn --workers`, which spawns fresh interpreters, this imports the
+app and the heavy numeric stacks (TensorFlow/Keras, scikit-learn, pandas) once
+in the parent and then forks. Workers share those pages copy-on-write, so the
+per-worker RSS is only what each worker builds after the fork: the Keras model
+itself (TensorFlow's runtime isn't fork-safe once initialized, so the model is
+loaded by each worker's warm-up) and request state. Forecast and weather
+caches live in the shared SQLite cache (see shared_cache.py).
+
+The NO2 feature store is not shared: each worker keeps (and snapshots) its own,
+so /no2-observations and /predict-no2/locations need a single worker.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+# Imported in the parent purely so workers inherit the loaded modules.
+PRELOAD_MODULES = ["tensorflow", "sklearn.ensemble", "sklearn.preprocessing", "pandas"]
+
+
+def _preload():
+    import importlib
+
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ Could not preload {name}: {e}")
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket):
+    config = uvicorn.Config(app, lifespan="on", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        sys.exit("backend.serve needs os.fork(); use `uvicorn --workers` instead")
+
+    _preload()
+    from backend.main import app
+
+    # Move everything imported so far out of the GC's reach so that collections
+    # in the workers don't touch (and un-share) these pages.
+    gc.collect()
+    gc.freeze()
+
+    os.environ["AEROGUARD_WORKERS"] = str(args.workers)
+    sock = _bind(args.host, args.port)
+    children: dict[int, int] = {}
+    stopping = False
+
+    def _spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            # Stable across restarts, so a restarted worker reloads its own snapshots
+            os.environ["AEROGUARD_WORKER_SLOT"] = str(slot)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                _run_worker(app, sock)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    print(f"🚀 Serving on {args.host}:{args.port} with {args.workers} workers")
+    for slot in range(args.workers):
+        _spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)
+            _spawn(slot)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
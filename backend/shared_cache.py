@@ -0,0 +1,113 @@
+"""
+Cross-process cache backed by a single SQLite file in WAL mode.
+
+Every uvicorn worker opens the same database, so a weather fetch or forecast
+computed by one worker is a cache hit for all the others. WAL lets readers run
+concurrently with the (short) writes.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".cache" / "aeroguard.sqlite3"
+CACHE_PATH = Path(os.getenv("AEROGUARD_CACHE_PATH", str(DEFAULT_CACHE_PATH)))
+
+# Expired rows are swept every this many writes
+_PURGE_EVERY = 256
+
+_local = threading.local()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """Return this thread's connection, reopening it after a fork."""
+    conns = getattr(_local, "conns", None)
+    if conns is None or getattr(_local, "pid", None) != os.getpid():
+        conns = _local.conns = {}
+        _local.pid = os.getpid()
+    conn = conns.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        conns[path] = conn
+    return conn
+
+
+class SharedCache:
+    """A namespaced key/value cache with a per-namespace TTL, shared by all workers."""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float | None = None,
+        path: Path | str | None = None,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.path = Path(path) if path is not None else CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = _connect(self.path).execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl_seconds: float | None = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.time() + ttl if ttl is not None else None
+        conn = _connect(self.path)
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at)"
+            " VALUES (?, ?, ?, ?)",
+            (self.namespace, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires_at),
+        )
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+
+    def get_or_set(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss."""
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: str):
+        _connect(self.path).execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,141 @@
+"""
+Lazily initialized backend subsystems.
+
+Each heavy dependency (TensorFlow model, Gemini client, AQI forecaster) is
+wrapped in a Subsystem so importing backend.main stays cheap and a single
+broken subsystem (e.g. a missing API key) doesn't take the whole server down.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+
+class SubsystemUnavailable(RuntimeError):
+    """Raised when a subsystem failed to initialize or isn't configured."""
+
+
+class SubsystemAbsent(SubsystemUnavailable):
+    """Raised by a loader when an optional resource simply isn't there (not an error)."""
+
+
+class Subsystem:
+    """A named resource that is built on first use (or by a background warm-up)."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Callable[[Any], None] | None = None,
+        retry_interval: float | None = None,
+    ):
+        self.name = name
+        # Seconds to wait before retrying a failed/absent load (None: retry on every get)
+        self.retry_interval = retry_interval
+        self._loader = loader
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self.state = "pending"  # pending -> loading -> ready | failed | absent
+        self.error: str | None = None
+        self.load_seconds: float | None = None
+        self._attempted_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def get(self) -> Any:
+        """
+        Return the initialized resource, loading it on the calling thread if needed.
+
+        Raises SubsystemUnavailable straight away, rather than blocking, while
+        another thread (e.g. the warm-up) is loading it.
+        """
+        if self.state == "ready":
+            return self._value
+        if not self._lock.acquire(blocking=False):
+            raise SubsystemUnavailable(f"{self.name} is still loading")
+        try:
+            if self.state != "ready" and not self._backing_off():
+                self._load()
+        finally:
+            self._lock.release()
+        if self.state != "ready":
+            raise SubsystemUnavailable(f"{self.name} unavailable: {self.error}")
+        return self._value
+
+    def _backing_off(self) -> bool:
+        return (
+            self.state in ("failed", "absent")
+            and self.retry_interval is not None
+            and time.monotonic() - self._attempted_at < self.retry_interval
+        )
+
+    def _load(self):
+        previous = self.state
+        self.state = "loading"
+        self._attempted_at = time.monotonic()
+        started = time.perf_counter()
+        try:
+            value = self._loader()
+            if self._warmup is not None:
+                self._warmup(value)
+        except SubsystemAbsent as e:
+            self.state = "absent"
+            self.error = str(e)
+            if previous != "absent":
+                print(f"ℹ️ Subsystem '{self.name}' not available: {e}")
+            return
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"⚠️ Subsystem '{self.name}' failed to initialize: {e}")
+            return
+        self._value = value
+        self.error = None
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.state = "ready"
+        print(f"✅ Subsystem '{self.name}' ready in {self.load_seconds}s")
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+        }
+
+
+class SubsystemRegistry:
+    """Holds all subsystems and drives the background warm-up."""
+
+    def __init__(self):
+        self._subsystems: dict[str, Subsystem] = {}
+
+    def register(self, subsystem: Subsystem) -> Subsystem:
+        self._subsystems[subsystem.name] = subsystem
+        return subsystem
+
+    def __getitem__(self, name: str) -> Subsystem:
+        return self._subsystems[name]
+
+    def warm_up_in_background(self) -> threading.Thread:
+        """Initialize every subsystem on a daemon thread so startup isn't blocked."""
+
+        def _run():
+            for subsystem in self._subsystems.values():
+                try:
+                    subsystem.get()
+                except SubsystemUnavailable:
+                    pass
+
+        thread = threading.Thread(target=_run, name="subsystem-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        return {name: s.status() for name, s in self._subsystems.items()}
+
+    @property
+    def all_ready(self) -> bool:
+        return all(s.ready for s in self._subsystems.values())
@@ -0,0 +1,145 @@
+"""
+Offline training for the global AQI forecaster.
+
+Builds one RandomForest across every city in SC_CITIES from several years of
+(cached) NASA POWER history and saves it as a versioned artifact that
+/city-aqi loads instead of fitting a model per request.
+
+    python -m backend.train_aqi_forecaster --years 3 --seed 42
+"""
+
+import argparse
+import os
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from backend.aqi_features import (
+    FEATURE_NAMES,
+    SC_CITIES,
+    WINDOW,
+    build_training_matrix,
+    calculate_aqi_array,
+    fill_missing_weather,
+    power_frame,
+)
+from backend.nasa_power import fetch_power_arrays
+
+ARTIFACT_DIR = Path(
+    os.getenv("AQI_FORECASTER_DIR", str(Path(__file__).resolve().parent / "models"))
+)
+ARTIFACT_PREFIX = "aqi_forecaster_v"
+
+
+def load_city_history(city, start_date, end_date, fetch=None, offline=False):
+    """
+    Daily weather for one city between start_date and end_date (inclusive).
+
+    Long ranges are fetched as parallel per-year chunks (see fetch_power_arrays);
+    `fetch` optionally replaces the per-chunk POWER request.
+    """
+    coords = SC_CITIES[city]
+    dates, values = fetch_power_arrays(
+        coords["lat"], coords["lon"], start_date, end_date, offline=offline, fetch=fetch
+    )
+    return fill_missing_weather(power_frame(dates, values))
+
+
+def build_dataset(histories, seed):
+    """Stack every city's (X, y); AQI labels are drawn with a seeded generator."""
+    rng = np.random.default_rng(seed)
+    X_parts, y_parts = [], []
+    for city, df in histories.items():
+        df = df.assign(aqi=calculate_aqi_array(df, rng))
+        X, y = build_training_matrix(df, city)
+        X_parts.append(X)
+        y_parts.append(y)
+    return np.vstack(X_parts), np.concatenate(y_parts)
+
+
+def train(histories, seed=42, n_estimators=200):
+    from sklearn.ensemble import RandomForestRegressor
+
+    X, y = build_dataset(histories, seed)
+    model = RandomForestRegressor(
+        n_estimators=n_estimators, min_samples_leaf=2, random_state=seed, n_jobs=-1
+    )
+    model.fit(X, y)
+    return model, len(y)
+
+
+def save_forecaster_artifact(model, metadata, out_dir=ARTIFACT_DIR):
+    import joblib
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"{ARTIFACT_PREFIX}{metadata['version']}.joblib"
+    joblib.dump({**metadata, "model": model}, path)
+    return path
+
+
+def latest_artifact_path(out_dir=ARTIFACT_DIR):
+    out_dir = Path(out_dir)
+    if not out_dir.exists():
+        return None
+    # Versions are UTC timestamps, so lexical order is chronological
+    paths = sorted(out_dir.glob(f"{ARTIFACT_PREFIX}*.joblib"))
+    return paths[-1] if paths else None
+
+
+def load_forecaster_artifact(path=None):
+    """Load a forecaster artifact (the newest one by default)."""
+    import joblib
+
+    path = path or os.getenv("AQI_FORECASTER_PATH") or latest_artifact_path()
+    if path is None or not Path(path).exists():
+        raise RuntimeError(f"No AQI forecaster artifact found in {ARTIFACT_DIR}")
+    artifact = joblib.load(path)
+    if list(artifact["feature_names"]) != FEATURE_NAMES:
+        raise RuntimeError(
+            f"Artifact {Path(path).name} was trained with different features; retrain it"
+        )
+    return artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the global AQI forecaster")
+    parser.add_argument("--years", type=int, default=3, help="Years of history per city")
+    parser.add_argument(
+        "--end-date",
+        type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+        default=date.today() - timedelta(days=7),
+        help="Last day of training history (YYYY-MM-DD)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--out-dir", type=Path, default=ARTIFACT_DIR)
+    args = parser.parse_args(argv)
+
+    end_date = args.end_date
+    start_date = end_date - timedelta(days=365 * args.years)
+
+    histories = {}
+    for city in SC_CITIES:
+        print(f"📡 Loading {city} history {start_date} → {end_date}...")
+        histories[city] = load_city_history(city, start_date, end_date)
+
+    print("🤖 Training global forecaster...")
+    model, n_samples = train(histories, seed=args.seed, n_estimators=args.n_estimators)
+
+    metadata = {
+        "version": datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S"),
+        "seed": args.seed,
+        "window": WINDOW,
+        "feature_names": FEATURE_NAMES,
+        "cities": list(SC_CITIES),
+        "history": [start_date.isoformat(), end_date.isoformat()],
+        "n_samples": n_samples,
+    }
+    path = save_forecaster_artifact(model, metadata, args.out_dir)
+    print(f"✅ Saved {path} ({n_samples} samples)")
+
+
+if __name__ == "__main__":
+    main()
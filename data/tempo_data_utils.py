@@ -11,7 +11,7 @@ import netCDF4 as nc
 import pandas as pd
 import numpy as np
 import os
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 
 
@@ -60,62 +60,283 @@ def load_tempo_dataset(results: List, index: int = 0) -> xr.Dataset:
     return ds
 
 
+def build_valid_mask(
+    data: np.ndarray,
+    fill_value: Optional[float] = None,
+    valid_min: Optional[float] = None,
+    valid_max: Optional[float] = None,
+    quality_flag: Optional[np.ndarray] = None,
+    max_quality_flag: Optional[int] = 0,
+    cloud_fraction: Optional[np.ndarray] = None,
+    max_cloud_fraction: Optional[float] = None,
+    latitude: Optional[np.ndarray] = None,
+    longitude: Optional[np.ndarray] = None,
+    extra_variables: Optional[List[Tuple[np.ndarray, Dict[str, float]]]] = None
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Combine every pixel filter into one boolean mask.
+
+    Filters are applied in order (fill value, non-finite, valid range,
+    geolocation, quality flag, cloud fraction, extra variables) and each pixel is
+    counted against the first filter that rejects it.
+
+    The combined mask is updated in place. Each filter still allocates
+    short-lived boolean temporaries (one byte per pixel), never float copies
+    of the data. Latitude and longitude are checked in whatever shape they are
+    passed, so 1-D L3 axes are validated before any broadcasting.
+
+    Args:
+        data: Raw (unmasked) product values
+        fill_value: The variable's _FillValue, if any
+        valid_min: The variable's valid_min (or valid_range[0]), if any
+        valid_max: The variable's valid_max (or valid_range[1]), if any
+        quality_flag: main_data_quality_flag values (same shape as data)
+        max_quality_flag: Highest flag value to keep (None disables the filter)
+        cloud_fraction: Effective cloud fraction values (same shape as data)
+        max_cloud_fraction: Highest cloud fraction to keep (None disables the filter)
+        latitude: Pixel latitudes, broadcastable to data (e.g. an (ny, 1) L3 axis)
+        longitude: Pixel longitudes, broadcastable to data (e.g. a (1, nx) L3 axis)
+        extra_variables: (values, attributes) pairs from _read_raw for other
+            columns being extracted; pixels where any of them is fill, non-finite
+            or out of its valid range are rejected too
+
+    Returns:
+        Tuple of (mask of pixels to keep, rejected pixel count per filter)
+    """
+    rejected = {}
+
+    def _reject(name, *bads):
+        nonlocal kept
+        for bad in bads:
+            # mask > bad is "keep and not bad"; bad may be any broadcastable shape
+            np.greater(mask, bad, out=mask)
+        now_kept = int(np.count_nonzero(mask))
+        rejected[name] = kept - now_kept
+        kept = now_kept
+
+    mask = np.ones(data.shape, dtype=bool)
+    kept = mask.size
+
+    if fill_value is not None:
+        _reject('fill_value', data == fill_value)
+    _reject('non_finite', ~np.isfinite(data))
+    if valid_min is not None or valid_max is not None:
+        # set_auto_mask(False) also turns off netCDF4's valid_min/valid_max masking
+        _reject('valid_range', _out_of_range(data, valid_min, valid_max))
+    if latitude is not None and longitude is not None:
+        # Catches NaN and fill-valued (e.g. -1e30) geolocation alike
+        _reject(
+            'geolocation',
+            ~((latitude >= -90) & (latitude <= 90)),
+            ~((longitude >= -180) & (longitude <= 180))
+        )
+    if quality_flag is not None and max_quality_flag is not None:
+        _reject('quality_flag', quality_flag > max_quality_flag)
+    if cloud_fraction is not None and max_cloud_fraction is not None:
+        # NaN/fill cloud fractions fall outside [0, max] and are rejected too
+        _reject(
+            'cloud_fraction',
+            ~((cloud_fraction >= 0) & (cloud_fraction <= max_cloud_fraction))
+        )
+    if extra_variables:
+        bad = np.zeros(data.shape, dtype=bool)
+        for values, attrs in extra_variables:
+            values = np.broadcast_to(values, data.shape)
+            bad |= ~np.isfinite(values)
+            if attrs.get('fill_value') is not None:
+                bad |= values == attrs['fill_value']
+            bad |= _out_of_range(values, attrs.get('valid_min'), attrs.get('valid_max'))
+        _reject('extra_variables', bad)
+
+    rejected['kept'] = kept
+    return mask, rejected
+
+
+def _out_of_range(
+    values: np.ndarray,
+    valid_min: Optional[float],
+    valid_max: Optional[float]
+) -> np.ndarray:
+    """Boolean array of values outside [valid_min, valid_max] (either bound optional)."""
+    bad = np.zeros(values.shape, dtype=bool)
+    if valid_min is not None:
+        bad |= values < valid_min
+    if valid_max is not None:
+        bad |= values > valid_max
+    return bad
+
+
+def _read_raw(group, name: str) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Read a variable without netCDF4's masked-array wrapping.
+
+    Returns the raw values plus the attributes netCDF4 would have masked with
+    (fill_value, valid_min, valid_max), so build_valid_mask can apply them.
+    """
+    var = group.variables[name]
+    var.set_auto_mask(False)
+    names = var.ncattrs()
+    attrs = {}
+    if '_FillValue' in names:
+        attrs['fill_value'] = var.getncattr('_FillValue')
+    if 'valid_range' in names:
+        attrs['valid_min'], attrs['valid_max'] = var.getncattr('valid_range')
+    if 'valid_min' in names:
+        attrs['valid_min'] = var.getncattr('valid_min')
+    if 'valid_max' in names:
+        attrs['valid_max'] = var.getncattr('valid_max')
+    return np.asarray(var[:]), attrs
+
+
 def extract_netcdf_to_csv(
     input_file: str,
     output_csv: Optional[str] = None,
     variable_name: str = 'vertical_column_troposphere',
     product_group: str = 'product',
-    geolocation_group: str = 'geolocation'
+    geolocation_group: str = 'geolocation',
+    extra_variables: Optional[List[str]] = None,
+    max_quality_flag: Optional[int] = 0,
+    max_cloud_fraction: Optional[float] = None,
+    quality_flag_name: str = 'main_data_quality_flag',
+    cloud_fraction_group: str = 'support_data',
+    cloud_fraction_name: str = 'eff_cloud_fraction'
 ) -> pd.DataFrame:
     """
     Extract data from a NetCDF file and save to CSV.
-    
+
+    Fill values, non-finite and out-of-valid-range values (in the main and any
+    extra variable), pixels whose quality flag exceeds max_quality_flag and
+    (optionally) cloudy pixels are removed with a single mask before the
+    DataFrame is built. The number of pixels each filter
+    rejected is stored in ``df.attrs['rejected_pixels']``.
+
     Args:
         input_file: Path to input .nc file
         output_csv: Path to output CSV file (optional)
-        variable_name: Name of the variable to extract
+        variable_name: Name of the variable to extract (and to filter on)
         product_group: Name of the product group in NetCDF
         geolocation_group: Name of the geolocation group in NetCDF
-    
+        extra_variables: Other product-group variables to extract alongside
+        max_quality_flag: Highest main_data_quality_flag to keep
+            (0 keeps only normal retrievals; None disables the filter)
+        max_cloud_fraction: Highest effective cloud fraction to keep (None disables)
+        quality_flag_name: Name of the quality flag variable in the product group
+        cloud_fraction_group: Group holding the cloud fraction variable
+        cloud_fraction_name: Name of the cloud fraction variable
+
     Returns:
         DataFrame with extracted data
     """
     # Open NetCDF file
     ds = nc.Dataset(input_file, mode='r')
-    
+
     try:
-        # Extract variables from groups
-        lat = ds.groups[geolocation_group].variables['latitude'][:]
-        lon = ds.groups[geolocation_group].variables['longitude'][:]
-        data_var = ds.groups[product_group].variables[variable_name][:]
-        
-        # Flatten everything
-        lat_flat = lat.flatten()
-        lon_flat = lon.flatten()
-        data_flat = data_var.flatten()
-        
+        product = ds.groups[product_group]
+        geolocation = ds.groups[geolocation_group]
+
+        # Read raw arrays; masking happens below in one place
+        data_var, data_attrs = _read_raw(product, variable_name)
+        lat, _ = _read_raw(geolocation, 'latitude')
+        lon, _ = _read_raw(geolocation, 'longitude')
+
+        # L3 grids have 1-D lat/lon axes: keep them as (ny, 1) / (1, nx) for the
+        # mask and only broadcast (as views) when compressing
+        if lat.ndim == 1 and lon.ndim == 1 and data_var.ndim >= 2:
+            lat = lat[:, None]
+            lon = lon[None, :]
+
+        quality_flag = None
+        if max_quality_flag is not None and quality_flag_name in product.variables:
+            quality_flag, _ = _read_raw(product, quality_flag_name)
+
+        cloud_fraction = None
+        if max_cloud_fraction is not None:
+            cloud_fraction, _ = _read_raw(
+                ds.groups[cloud_fraction_group], cloud_fraction_name
+            )
+
+        # Extra columns are read up front so their own fill/range checks join the mask
+        extras = {name: _read_raw(product, name) for name in extra_variables or []}
+
+        mask, rejected = build_valid_mask(
+            data_var,
+            fill_value=data_attrs.get('fill_value'),
+            valid_min=data_attrs.get('valid_min'),
+            valid_max=data_attrs.get('valid_max'),
+            quality_flag=quality_flag,
+            max_quality_flag=max_quality_flag,
+            cloud_fraction=cloud_fraction,
+            max_cloud_fraction=max_cloud_fraction,
+            latitude=lat,
+            longitude=lon,
+            extra_variables=list(extras.values())
+        )
+
+        # Compress every column with the same mask before any DataFrame exists
+        columns = {
+            'latitude': np.broadcast_to(lat, mask.shape)[mask],
+            'longitude': np.broadcast_to(lon, mask.shape)[mask],
+            variable_name: data_var[mask]
+        }
+        del data_var
+        for name, (values, _) in extras.items():
+            columns[name] = np.broadcast_to(values, mask.shape)[mask]
+        del extras
+
         # Build DataFrame
-        df = pd.DataFrame({
-            'latitude': lat_flat,
-            'longitude': lon_flat,
-            variable_name: data_flat
-        })
-        
-        # Clean data (remove NaN/Inf)
-        df = df.replace([np.inf, -np.inf], np.nan).dropna()
-        
+        df = pd.DataFrame(columns, copy=False)
+        df.attrs['rejected_pixels'] = rejected
+        print(f"🧹 Pixel filter: {rejected}")
+
         # Save to CSV if output path is provided
         if output_csv:
             df.to_csv(output_csv, index=False)
             print(f"✅ CSV saved as: {os.path.abspath(output_csv)}")
-        
+
         return df
-        
+
     finally:
         # Always close the dataset
         ds.close()
 
 
+def push_to_feature_store(
+    df: pd.DataFrame,
+    store,
+    locations: Dict[str, Tuple[float, float]],
+    variable_name: str = 'vertical_column_troposphere',
+    radius_deg: float = 0.05
+) -> Dict[str, float]:
+    """
+    Push one granule's NO2 value per tracked location into a feature store.
+
+    Args:
+        df: DataFrame from extract_netcdf_to_csv (latitude, longitude, variable)
+        store: Feature store with a push(location, value) method
+               (e.g. backend.feature_store.NO2FeatureStore)
+        locations: Mapping of location name to (latitude, longitude)
+        variable_name: Column holding the NO2 values
+        radius_deg: Half-width of the box around each location to average over
+
+    Returns:
+        Dictionary of location name to the value pushed (locations with no
+        valid pixels in range are skipped)
+    """
+    lat = df['latitude'].to_numpy()
+    lon = df['longitude'].to_numpy()
+    values = df[variable_name].to_numpy()
+
+    pushed = {}
+    for name, (loc_lat, loc_lon) in locations.items():
+        in_box = (np.abs(lat - loc_lat) <= radius_deg) & (np.abs(lon - loc_lon) <= radius_deg)
+        if in_box.any():
+            value = float(values[in_box].mean())
+            store.push(name, value)
+            pushed[name] = value
+
+    return pushed
+
+
 def inspect_netcdf_structure(file_path: str):
     """
     Print the structure of a NetCDF file.